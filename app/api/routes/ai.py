@@ -1,9 +1,15 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from app.api.routes.request_models.chat_request import (
+    EOPBatchGenerationRequest,
     EOPGenerationRequest,
     TaskGenerationRequest,
 )
+from app.core.singleflight import single_flight
+from app.llm.rate_limiter import RateLimitExceeded
+from app.helper.sse import SSE_HEADERS, sse_stream
 from app.services.eop_service import eop_service
+from app.services.pipeline_service import pipeline_service
 from app.services.task_service import task_service
 from typing import Dict, Any
 from app.core.config import settings
@@ -11,6 +17,41 @@ from app.core.config import settings
 router = APIRouter()
 
 
+def validate_eop_request(request: EOPGenerationRequest) -> None:
+    if not request.flood_data.strip():
+        raise HTTPException(status_code=400, detail="Flood data is required")
+
+    if not request.resource_data.strip():
+        raise HTTPException(status_code=400, detail="Resource data is required")
+
+    if not request.location.strip():
+        raise HTTPException(status_code=400, detail="Location is required")
+
+
+def batch_locations(request: EOPBatchGenerationRequest) -> list[str]:
+    """Validate a batch request and return its distinct, non-empty locations."""
+    if not request.flood_data.strip():
+        raise HTTPException(status_code=400, detail="Flood data is required")
+
+    if not request.resource_data.strip():
+        raise HTTPException(status_code=400, detail="Resource data is required")
+
+    locations = list(
+        dict.fromkeys(
+            location.strip() for location in request.locations if location.strip()
+        )
+    )
+    if not locations:
+        raise HTTPException(status_code=400, detail="At least one location is required")
+
+    if len(locations) > settings.EOP_BATCH_MAX_LOCATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.EOP_BATCH_MAX_LOCATIONS} locations are allowed",
+        )
+    return locations
+
+
 @router.post("/generate-eop", response_model=Dict[str, Any])
 async def generate_eop(request: EOPGenerationRequest) -> Dict[str, Any]:
     """
@@ -27,20 +68,16 @@ async def generate_eop(request: EOPGenerationRequest) -> Dict[str, Any]:
     """
     try:
         # Validate input data
-        if not request.flood_data.strip():
-            raise HTTPException(status_code=400, detail="Flood data is required")
-
-        if not request.resource_data.strip():
-            raise HTTPException(status_code=400, detail="Resource data is required")
-
-        if not request.location.strip():
-            raise HTTPException(status_code=400, detail="Location is required")
+        validate_eop_request(request)
 
         # Generate EOP using the service
-        result = await eop_service.generate_eop(
-            flood_data=request.flood_data,
-            resource_data=request.resource_data,
-            location=request.location,
+        result = await single_flight.do(
+            single_flight.make_key("generate-eop", request.model_dump()),
+            lambda: eop_service.generate_eop(
+                flood_data=request.flood_data,
+                resource_data=request.resource_data,
+                location=request.location,
+            ),
         )
 
         # Check if generation was successful
@@ -51,10 +88,170 @@ async def generate_eop(request: EOPGenerationRequest) -> Dict[str, Any]:
 
     except HTTPException:
         raise
+    except RateLimitExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+
+@router.post("/generate-eop/stream")
+async def generate_eop_stream(request: EOPGenerationRequest) -> StreamingResponse:
+    """
+    Stream an Emergency Operations Plan (EOP) as Server-Sent Events.
+
+    Emits `token` events with the raw model output as it is generated, then a
+    single `done` event carrying the same report as /generate-eop (or an
+    `error` event).
+
+    Args:
+        request: EOPGenerationRequest containing flood_data, resource_data, and location
+
+    Returns:
+        A text/event-stream response
+    """
+    validate_eop_request(request)
+
+    return StreamingResponse(
+        sse_stream(
+            eop_service.stream_eop(
+                flood_data=request.flood_data,
+                resource_data=request.resource_data,
+                location=request.location,
+            )
+        ),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+@router.post("/generate-eop/batch", response_model=Dict[str, Any])
+async def generate_eop_batch(request: EOPBatchGenerationRequest) -> Dict[str, Any]:
+    """
+    Generate Emergency Operations Plans for several locations at once.
+
+    All locations share the same flood and resource data and are generated
+    concurrently (bounded by EOP_BATCH_CONCURRENCY). A location that fails
+    does not fail the batch; its result carries status "error".
+
+    Args:
+        request: EOPBatchGenerationRequest containing flood_data, resource_data, and locations
+
+    Returns:
+        Dictionary with the batch status ("success", "partial" or "error"),
+        counts, and one result per location in request order
+    """
+    locations = batch_locations(request)
+    return await eop_service.generate_eop_batch(
+        flood_data=request.flood_data,
+        resource_data=request.resource_data,
+        locations=locations,
+    )
+
+
+@router.post("/generate-eop/batch/stream")
+async def generate_eop_batch_stream(
+    request: EOPBatchGenerationRequest,
+) -> StreamingResponse:
+    """
+    Stream batch EOP results as Server-Sent Events.
+
+    Emits one `result` event per location as soon as its plan is ready (in
+    completion order, with the location's index in the request), then a
+    `done` event with the batch status and counts.
+
+    Args:
+        request: EOPBatchGenerationRequest containing flood_data, resource_data, and locations
+
+    Returns:
+        A text/event-stream response
+    """
+    locations = batch_locations(request)
+
+    return StreamingResponse(
+        sse_stream(
+            eop_service.stream_eop_batch(
+                flood_data=request.flood_data,
+                resource_data=request.resource_data,
+                locations=locations,
+            )
+        ),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
+@router.post("/generate-eop-and-tasks", response_model=Dict[str, Any])
+async def generate_eop_and_tasks(request: EOPGenerationRequest) -> Dict[str, Any]:
+    """
+    Generate an Emergency Operations Plan (EOP) and its volunteer tasks in one call.
+
+    The generated EOP is passed straight to task generation on the server, so
+    clients do not need to send it back to /generate-tasks.
+
+    Args:
+        request: EOPGenerationRequest containing flood_data, resource_data, and location
+
+    Returns:
+        Dictionary with the EOP report, the task list, and per-stage timings
+        in metadata. status is "partial" if the tasks could not be generated.
+    """
+    try:
+        validate_eop_request(request)
+
+        result = await single_flight.do(
+            single_flight.make_key("generate-eop-and-tasks", request.model_dump()),
+            lambda: pipeline_service.generate_eop_and_tasks(
+                flood_data=request.flood_data,
+                resource_data=request.resource_data,
+                location=request.location,
+            ),
+        )
+
+        if result["status"] == "error":
+            raise HTTPException(status_code=500, detail=result["message"])
+
+        return result
+
+    except HTTPException:
+        raise
+    except RateLimitExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
 
+@router.post("/generate-eop-and-tasks/stream")
+async def generate_eop_and_tasks_stream(
+    request: EOPGenerationRequest,
+) -> StreamingResponse:
+    """
+    Stream the EOP-to-tasks pipeline as Server-Sent Events.
+
+    Emits the EOP's `token` events, an `eop` event with the report, a `tasks`
+    event with the task list, and a final `done` event with the status and
+    per-stage timings (or an `error` event if the EOP fails).
+
+    Args:
+        request: EOPGenerationRequest containing flood_data, resource_data, and location
+
+    Returns:
+        A text/event-stream response
+    """
+    validate_eop_request(request)
+
+    return StreamingResponse(
+        sse_stream(
+            pipeline_service.stream_eop_and_tasks(
+                flood_data=request.flood_data,
+                resource_data=request.resource_data,
+                location=request.location,
+            )
+        ),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+
 @router.post("/generate-tasks", response_model=Dict[str, Any])
 async def generate_tasks(request: TaskGenerationRequest) -> Dict[str, Any]:
     """
@@ -83,10 +280,13 @@ async def generate_tasks(request: TaskGenerationRequest) -> Dict[str, Any]:
             raise HTTPException(status_code=400, detail="Resource data is required")
 
         # Generate tasks using the service
-        result = await task_service.generate_tasks(
-            emergency_operations_plan=request.emergency_operations_plan,
-            flood_data=request.flood_data,
-            resource_data=request.resource_data,
+        result = await single_flight.do(
+            single_flight.make_key("generate-tasks", request.model_dump()),
+            lambda: task_service.generate_tasks(
+                emergency_operations_plan=request.emergency_operations_plan,
+                flood_data=request.flood_data,
+                resource_data=request.resource_data,
+            ),
         )
 
         # Check if generation was successful
@@ -97,6 +297,8 @@ async def generate_tasks(request: TaskGenerationRequest) -> Dict[str, Any]:
 
     except HTTPException:
         raise
+    except RateLimitExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
@@ -1,5 +1,10 @@
 from fastapi import APIRouter, HTTPException, UploadFile
+from fastapi.responses import StreamingResponse
 from typing import List
+from app.core.singleflight import single_flight
+from app.helper.sse import SSE_HEADERS, sse_stream
+from app.llm.query_cache import normalize_question
+from app.llm.rate_limiter import RateLimitExceeded
 from app.services.chat_service import ChatService
 from .request_models.chat_request import QuestionRequest
 
@@ -9,14 +14,22 @@ router = APIRouter()
 @router.post("/generate-warnings")
 async def chat():
     try:
-        return chat_service.generate_warning()
+        return await single_flight.do(
+            single_flight.make_key("generate-warnings", {}),
+            chat_service.agenerate_warning,
+        )
+    except RateLimitExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/create-chatbot")
-async def create_chatbot():
+async def create_chatbot(incremental: bool = False):
     try:
-        return chat_service.create_chatbot()
+        return await single_flight.do(
+            single_flight.make_key("create-chatbot", {"incremental": incremental}),
+            lambda: chat_service.acreate_chatbot(incremental=incremental),
+        )
     except Exception as e:
         print(e)
         raise HTTPException(status_code=500, detail=str(e))
@@ -24,13 +37,39 @@ async def create_chatbot():
 @router.post("/ask-latest-chatbot")
 async def ask_latest_chatbot(payload: QuestionRequest):
     try:
-        return chat_service.ask_latest_chatbot(payload.question)
+        return await single_flight.do(
+            single_flight.make_key(
+                "ask-latest-chatbot", normalize_question(payload.question)
+            ),
+            lambda: chat_service.aask_latest_chatbot(payload.question),
+        )
+    except RateLimitExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/ask-latest-chatbot/stream")
+async def ask_latest_chatbot_stream(payload: QuestionRequest):
+    return StreamingResponse(
+        sse_stream(chat_service.astream_latest_chatbot(payload.question)),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
 @router.post("/ask-without-faiss")
 async def ask_without_faiss(payload: QuestionRequest):
     try:
-        return chat_service.ask_without_faiss(payload.question)
+        return await single_flight.do(
+            single_flight.make_key(
+                "ask-without-faiss", normalize_question(payload.question)
+            ),
+            lambda: chat_service.aask_without_faiss(payload.question),
+        )
+    except RateLimitExceeded as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/cache-stats")
+async def cache_stats():
+    return {**chat_service.cache_stats(), "single_flight": single_flight.stats()}
@@ -8,6 +8,11 @@ class EOPGenerationRequest(BaseModel):
     resource_data: str
     location: str
 
+class EOPBatchGenerationRequest(BaseModel):
+    flood_data: str
+    resource_data: str
+    locations: list[str]
+
 class TaskGenerationRequest(BaseModel):
     emergency_operations_plan: str
     flood_data: str
@@ -53,5 +53,156 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str | None = None
     HUGGINGFACEHUB_API_TOKEN: str | None = None
     STRAPI_URL: str | None = None
-    
+
+    # Connection pool shared by all OpenAI chat and embedding clients
+    LLM_HTTP_MAX_CONNECTIONS: int = 100
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = 60.0
+    LLM_HTTP_TIMEOUT: float = 120.0
+    LLM_HTTP_CONNECT_TIMEOUT: float = 10.0
+    # Requires the h2 package
+    LLM_HTTP2: bool = False
+
+    # Per-model upstream limits shared by all workers through SQLite. Set
+    # RATE_LIMITS to the account's real limits before enabling, e.g.
+    # {"gpt-4o": {"rpm": 500, "tpm": 30000}}; models without an entry are
+    # not limited.
+    RATE_LIMIT_ENABLED: bool = False
+    RATE_LIMIT_DB_PATH: str = "data/rate_limiter.sqlite3"
+    RATE_LIMITS: dict[str, dict[str, int]] = {}
+    RATE_LIMIT_MAX_WAITERS: int = 100
+    RATE_LIMIT_MAX_WAIT_SECONDS: float = 60.0
+    # Completion tokens assumed per chatbot call when reserving token budget
+    RATE_LIMIT_COMPLETION_TOKENS: int = 500
+
+    # Timeouts, retries and hedging for LLM calls
+    LLM_CHAT_TIMEOUT_SECONDS: float = 60.0
+    LLM_CHAT_DEADLINE_SECONDS: float = 120.0
+    # EOP and task generation
+    LLM_LONG_TIMEOUT_SECONDS: float = 180.0
+    LLM_LONG_DEADLINE_SECONDS: float = 400.0
+    LLM_MAX_ATTEMPTS: int = 3
+    LLM_BACKOFF_INITIAL_SECONDS: float = 0.5
+    LLM_BACKOFF_MAX_SECONDS: float = 8.0
+    # Fire a duplicate request after the observed p95 latency
+    LLM_HEDGE_ENABLED: bool = False
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+
+    # Threads used to run blocking work off the event loop
+    BLOCKING_EXECUTOR_WORKERS: int = 8
+    # Processes used for CPU-bound parsing; 0 keeps it in-process
+    PROCESS_EXECUTOR_WORKERS: int = 2
+
+    # Outbound HTTP used by the nchmf crawler
+    CRAWL_TIMEOUT_SECONDS: float = 20.0
+    CRAWL_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    CRAWL_MAX_CONNECTIONS: int = 20
+    CRAWL_PER_HOST_CONCURRENCY: int = 4
+    CRAWL_MAX_ATTEMPTS: int = 3
+    CRAWL_BACKOFF_INITIAL_SECONDS: float = 0.5
+    CRAWL_BACKOFF_MAX_SECONDS: float = 5.0
+
+    # Conditional-GET cache of crawled pages and PDFs; offline mode replays
+    # the cache without touching the network
+    HTTP_CACHE_ENABLED: bool = True
+    HTTP_CACHE_DIR: str = "data/http_cache"
+    HTTP_CACHE_OFFLINE: bool = False
+    # Entries not refreshed for this long, then the oldest beyond the size
+    # limit, are pruned after writes (0 disables either limit)
+    HTTP_CACHE_MAX_AGE_DAYS: float = 30
+    HTTP_CACHE_MAX_BYTES: int = 1024 * 1024 * 1024
+
+    # BeautifulSoup parser for crawled pages ("auto" picks lxml when installed)
+    HTML_PARSER: str = "auto"
+    HTML_PARSE_IN_PROCESS: bool = False
+
+    # Bulletin PDF text extraction
+    PDF_TEXT_CACHE_DIR: str = "data/pdf_text_cache"
+    PDF_TEXT_CACHE_MAX_AGE_DAYS: float = 90
+    PDF_TEXT_CACHE_MAX_BYTES: int = 256 * 1024 * 1024
+    PDF_PARALLEL_MIN_PAGES: int = 16
+
+    # Local snapshot of the VNDMS warnings feed, synced incrementally
+    VNDMS_SNAPSHOT_PATH: str = "data/vndms_snapshot.json"
+    VNDMS_RETENTION_HOURS: int = 24
+    VNDMS_PAGE_SIZE: int = 100
+    VNDMS_BOOTSTRAP_LIMIT: int = 24
+
+    # Locations generated at once by the batch EOP endpoints
+    EOP_BATCH_CONCURRENCY: int = 4
+    EOP_BATCH_MAX_LOCATIONS: int = 50
+
+    # Loaded FAISS indexes kept in memory per worker
+    VECTOR_DB_CACHE_MAX_ENTRIES: int = 8
+    VECTOR_DB_CACHE_MAX_BYTES: int = 1024 * 1024 * 1024
+    # Memory-map indexes so uvicorn workers share one copy in the page cache
+    VECTOR_DB_MMAP: bool = True
+
+    # FAISS index type: flat, hnsw, ivf_flat, ivf_pq, or auto (by corpus size)
+    VECTOR_INDEX_TYPE: Literal["auto", "flat", "hnsw", "ivf_flat", "ivf_pq"] = "auto"
+    VECTOR_INDEX_HNSW_M: int = 32
+    VECTOR_INDEX_HNSW_EF_CONSTRUCTION: int = 80
+    VECTOR_INDEX_HNSW_EF_SEARCH: int = 64
+    # 0 derives nlist from the corpus size
+    VECTOR_INDEX_IVF_NLIST: int = 0
+    VECTOR_INDEX_IVF_NPROBE: int = 16
+    VECTOR_INDEX_PQ_M: int = 16
+    VECTOR_INDEX_TRAIN_SAMPLE_SIZE: int = 50_000
+    VECTOR_INDEX_AUTO_FLAT_MAX: int = 20_000
+    VECTOR_INDEX_AUTO_IVF_FLAT_MAX: int = 200_000
+
+    # Retrieval context assembled into the chatbot prompt
+    CONTEXT_FETCH_K: int = 20
+    CONTEXT_TOKEN_BUDGET: int = 3000
+    # 1.0 ranks by relevance only, lower values favour diversity
+    CONTEXT_MMR_LAMBDA: float = 0.7
+
+    # Embedding backend. Indexes must be queried with the backend (and model)
+    # they were built with, so rebuild them after switching.
+    EMBEDDING_BACKEND: Literal["openai", "local"] = "openai"
+    OPENAI_EMBEDDING_MODEL: str = "text-embedding-3-small"
+    LOCAL_EMBEDDING_MODEL: str = (
+        "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+    )
+    LOCAL_EMBEDDING_DEVICE: str = "cpu"
+    LOCAL_EMBEDDING_BATCH_SIZE: int = 64
+    # 0 keeps the torch default
+    LOCAL_EMBEDDING_THREADS: int = 0
+    LOCAL_EMBEDDING_MULTI_PROCESS: bool = False
+    LOCAL_EMBEDDING_ONNX: bool = False
+    # Quantized export shipped with sentence-transformers models
+    LOCAL_EMBEDDING_ONNX_FILE: str | None = "onnx/model_qint8_avx2.onnx"
+
+    # Content-addressed cache of chunk embeddings used during index builds
+    EMBEDDING_CACHE_PATH: str = "data/embedding_cache.sqlite3"
+
+    # Batching of embedding requests during index builds
+    EMBEDDING_BATCH_MAX_TOKENS: int = 100_000
+    EMBEDDING_BATCH_MAX_SIZE: int = 512
+    EMBEDDING_MAX_CONCURRENCY: int = 4
+
+    # Question vectors shared across chatbot ids
+    QUERY_EMBEDDING_CACHE_MAX_ENTRIES: int = 10_000
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS: int = 6 * 60 * 60
+
+    # Answers reused for near-identical questions against the same index
+    ANSWER_CACHE_ENABLED: bool = True
+    ANSWER_CACHE_MAX_DISTANCE: float = 0.03
+    ANSWER_CACHE_MAX_ENTRIES: int = 1000
+
+    # Local intent checks that answer shelter/off-topic questions without the LLM
+    INTENT_CLASSIFIER_ENABLED: bool = True
+    INTENT_KNN_ENABLED: bool = False
+    INTENT_KNN_K: int = 3
+    INTENT_KNN_MIN_SIMILARITY: float = 0.85
+
+    @model_validator(mode="after")
+    def _require_rate_limits(self) -> Self:
+        if self.RATE_LIMIT_ENABLED and not self.RATE_LIMITS:
+            raise ValueError(
+                "RATE_LIMIT_ENABLED requires RATE_LIMITS with the account's "
+                "rpm/tpm per model"
+            )
+        return self
+
 settings = Settings()  # type: ignore
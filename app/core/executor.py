@@ -0,0 +1,45 @@
+import asyncio
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+from app.core.config import settings
+
+# Bounded pool for blocking work (crawls, FAISS search, index builds) called
+# from async request handlers, so it never runs on the event loop
+blocking_executor = ThreadPoolExecutor(
+    max_workers=settings.BLOCKING_EXECUTOR_WORKERS, thread_name_prefix="blocking"
+)
+
+
+async def run_blocking(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        blocking_executor, functools.partial(func, *args, **kwargs)
+    )
+
+
+_process_executor: ProcessPoolExecutor | None = None
+_process_executor_lock = threading.Lock()
+
+
+def get_process_executor() -> ProcessPoolExecutor | None:
+    """
+    Shared process pool for CPU-bound parsing (PDF pages, HTML), created on
+    first use. Returns None when PROCESS_EXECUTOR_WORKERS is 0.
+
+    Workers are spawned rather than forked, since the parent runs threads.
+    Functions submitted to it must be importable at module level.
+    """
+    global _process_executor
+    if settings.PROCESS_EXECUTOR_WORKERS <= 0:
+        return None
+    with _process_executor_lock:
+        if _process_executor is None:
+            _process_executor = ProcessPoolExecutor(
+                max_workers=settings.PROCESS_EXECUTOR_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _process_executor
@@ -0,0 +1,65 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical requests within a worker.
+
+    The first caller for a key starts the computation as a task; callers
+    arriving while it is in flight wait for the same task and share its
+    result (or its exception). Every caller awaits it through asyncio.shield,
+    so a disconnecting caller, the first one included, does not cancel it for
+    the others. The task is only cancelled once no caller is waiting for it.
+    """
+
+    def __init__(self):
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._waiters: dict[asyncio.Task, int] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def make_key(endpoint: str, payload: Any) -> str:
+        encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return f"{endpoint}:{hashlib.sha256(encoded.encode('utf-8')).hexdigest()}"
+
+    def _done(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> T:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            task.add_done_callback(lambda done: self._done(key, done))
+            self._inflight[key] = task
+            self._waiters[task] = 0
+            self.executed += 1
+        else:
+            self.coalesced += 1
+
+        self._waiters[task] += 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                # Nobody is left to use the result
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._inflight),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+        }
+
+
+single_flight = SingleFlight()
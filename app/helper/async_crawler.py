@@ -0,0 +1,200 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+import httpx
+from tenacity import (
+    AsyncRetrying,
+    retry_if_exception_type,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+from app.core.config import settings
+from app.core.executor import run_blocking
+from app.helper.http_cache import HTTPCache, http_cache
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class _RetryableStatus(Exception):
+    def __init__(self, response: httpx.Response):
+        super().__init__(f"HTTP {response.status_code}")
+        self.response = response
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status_code: int | None = None
+    content: bytes = b""
+    encoding: str | None = None
+    headers: dict[str, str] = field(default_factory=dict)
+    error: str | None = None
+    attempts: int = 0
+    elapsed: float = 0.0
+    from_cache: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code == 200
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+
+class AsyncCrawler:
+    """
+    Concurrent page fetcher for the crawl helpers.
+
+    One pooled httpx.AsyncClient is shared by every request of a crawl, at
+    most per_host_concurrency requests run against the same host at a time,
+    and transport errors or 429/5xx responses are retried with jittered
+    exponential backoff. Failures are returned as FetchResults with error set
+    rather than raised, so one bad link does not abort a crawl. Use it as an
+    async context manager.
+
+    With an HTTPCache, requests are conditional and a 304 is answered from
+    disk; in offline mode only the cache is consulted.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = settings.CRAWL_MAX_CONNECTIONS,
+        per_host_concurrency: int = settings.CRAWL_PER_HOST_CONCURRENCY,
+        timeout: float = settings.CRAWL_TIMEOUT_SECONDS,
+        connect_timeout: float = settings.CRAWL_CONNECT_TIMEOUT_SECONDS,
+        max_attempts: int = settings.CRAWL_MAX_ATTEMPTS,
+        backoff_initial: float = settings.CRAWL_BACKOFF_INITIAL_SECONDS,
+        backoff_max: float = settings.CRAWL_BACKOFF_MAX_SECONDS,
+        cache: HTTPCache | None = http_cache,
+        offline: bool = settings.HTTP_CACHE_OFFLINE,
+    ):
+        self.cache = cache
+        self.offline = offline
+        self.per_host_concurrency = per_host_concurrency
+        self.max_attempts = max_attempts
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=httpx.Timeout(timeout, connect=connect_timeout),
+            follow_redirects=True,
+        )
+        self._host_semaphores: dict[str, asyncio.Semaphore] = {}
+        self.results: list[FetchResult] = []
+
+    async def __aenter__(self) -> "AsyncCrawler":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    def _semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_host_concurrency)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    async def _get(
+        self, url: str, headers: dict[str, str], result: FetchResult
+    ) -> httpx.Response:
+        result.attempts += 1
+        async with self._semaphore(url):
+            response = await self.client.get(url, headers=headers)
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            raise _RetryableStatus(response)
+        return response
+
+    def _from_cache(self, result: FetchResult, cached) -> None:
+        result.status_code = 200
+        result.content = cached.content
+        result.encoding = cached.encoding
+        result.from_cache = True
+        self.cache.record_hit(cached)
+
+    async def fetch(self, url: str) -> FetchResult:
+        result = FetchResult(url=url)
+        started = time.perf_counter()
+        cached = None
+        if self.cache is not None:
+            cached = await run_blocking(self.cache.get, url)
+
+        if self.offline:
+            if cached is not None:
+                self._from_cache(result, cached)
+            else:
+                result.error = "Not cached (offline mode)"
+            result.elapsed = time.perf_counter() - started
+            self.results.append(result)
+            return result
+
+        headers = HTTPCache.conditional_headers(cached)
+        try:
+            async for attempt in AsyncRetrying(
+                stop=stop_after_attempt(self.max_attempts),
+                wait=wait_random_exponential(
+                    multiplier=self.backoff_initial, max=self.backoff_max
+                ),
+                retry=retry_if_exception_type(
+                    (httpx.TransportError, _RetryableStatus)
+                ),
+                reraise=True,
+            ):
+                with attempt:
+                    response = await self._get(url, headers, result)
+        except _RetryableStatus as e:
+            response = e.response
+        except httpx.HTTPError as e:
+            response = None
+            result.error = f"{type(e).__name__}: {e}"
+
+        if response is not None and response.status_code == 304 and cached:
+            self._from_cache(result, cached)
+        elif response is not None:
+            result.status_code = response.status_code
+            result.content = response.content
+            result.encoding = response.encoding
+            result.headers = dict(response.headers)
+            if response.status_code != 200:
+                result.error = f"HTTP {response.status_code}"
+            elif self.cache is not None:
+                self.cache.record_miss()
+                await run_blocking(
+                    self.cache.put,
+                    url,
+                    result.content,
+                    result.encoding,
+                    result.headers,
+                )
+        result.elapsed = time.perf_counter() - started
+        self.results.append(result)
+        return result
+
+    async def fetch_all(self, urls: list[str]) -> list[FetchResult]:
+        """Fetch urls concurrently; results are in the same order as urls."""
+        return list(await asyncio.gather(*(self.fetch(url) for url in urls)))
+
+    def timings(self) -> list[dict]:
+        """Per-URL fetch status, attempts and seconds, slowest first."""
+        return [
+            {
+                "url": result.url,
+                "status_code": result.status_code,
+                "attempts": result.attempts,
+                "seconds": round(result.elapsed, 3),
+                "from_cache": result.from_cache,
+                "error": result.error,
+            }
+            for result in sorted(self.results, key=lambda r: r.elapsed, reverse=True)
+        ]
@@ -0,0 +1,79 @@
+import os
+import threading
+import time
+
+# Scanning a cache directory is cheap but not free, so writers prune at most
+# this often per process
+PRUNE_INTERVAL_SECONDS = 600
+
+
+class CachePruner:
+    """
+    Age- and size-based pruning of an on-disk cache directory.
+
+    Files are grouped into entries by the name before the first dot, so a
+    key.json / key.body pair is kept or removed together. Entries whose newest
+    file is older than max_age_days are removed first; then, while the
+    directory is over max_bytes, the least recently written entries go. A
+    limit of 0 disables that check. Temporary files still being written are
+    left alone. Caches call maybe_prune after a write; files removed under a
+    concurrent reader only cause a cache miss.
+    """
+
+    def __init__(self, interval_seconds: float = PRUNE_INTERVAL_SECONDS):
+        self.interval_seconds = interval_seconds
+        self._lock = threading.Lock()
+        self._last_run = 0.0
+        self.pruned = 0
+
+    def maybe_prune(self, directory: str, max_age_days: float, max_bytes: int) -> int:
+        """Prune directory if the interval has passed; return entries removed."""
+        with self._lock:
+            now = time.monotonic()
+            if self._last_run and now - self._last_run < self.interval_seconds:
+                return 0
+            self._last_run = now
+        return self.prune(directory, max_age_days, max_bytes)
+
+    def prune(self, directory: str, max_age_days: float, max_bytes: int) -> int:
+        entries: dict[str, list] = {}
+        try:
+            scanned = list(os.scandir(directory))
+        except OSError:
+            return 0
+        for item in scanned:
+            if item.name.endswith(".tmp"):
+                continue
+            try:
+                stat = item.stat()
+            except OSError:
+                continue
+            key = item.name.split(".", 1)[0]
+            # [newest mtime, total size, paths]
+            entry = entries.setdefault(key, [0.0, 0, []])
+            entry[0] = max(entry[0], stat.st_mtime)
+            entry[1] += stat.st_size
+            entry[2].append(item.path)
+
+        oldest_first = sorted(entries.values(), key=lambda entry: entry[0])
+        total_bytes = sum(entry[1] for entry in oldest_first)
+        cutoff = time.time() - max_age_days * 86400 if max_age_days > 0 else None
+        removed = 0
+        for mtime, size, paths in oldest_first:
+            expired = cutoff is not None and mtime < cutoff
+            oversized = max_bytes > 0 and total_bytes > max_bytes
+            if not expired and not oversized:
+                break
+            for path in paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total_bytes -= size
+            removed += 1
+
+        if removed:
+            print(f"Pruned {removed} cache entries from {directory}")
+            with self._lock:
+                self.pruned += removed
+        return removed
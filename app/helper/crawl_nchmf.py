@@ -1,101 +1,197 @@
+import asyncio
 from datetime import datetime
-import os
-import requests
+from urllib.parse import urljoin
 from bs4 import BeautifulSoup
+from bs4.element import NavigableString, PreformattedString
 
+from app.core.config import settings
+from app.core.executor import get_process_executor, run_blocking
+from .async_crawler import AsyncCrawler
 from .pdf import extract_text_from_pdf
 
-def crawl_nchmf():
-    url = "https://nchmf.gov.vn/Kttv/vi-VN/1/index.html"
+NCHMF_NEWS_URL = "https://nchmf.gov.vn/Kttv/vi-VN/1/index.html"
+
+
+def _html_parser():
+    if settings.HTML_PARSER != "auto":
+        return settings.HTML_PARSER
+    try:
+        import lxml  # noqa: F401
+    except ImportError:
+        return "html.parser"
+    return "lxml"
+
+
+# BeautifulSoup tree builder used by every parse in this module
+HTML_PARSER = _html_parser()
+
+
+async def _aparse(func, *args):
+    """Run a parse function off the event loop, in the process pool if enabled."""
+    executor = get_process_executor() if settings.HTML_PARSE_IN_PROCESS else None
+    if executor is None:
+        return await run_blocking(func, *args)
+    return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
 
+
+def parse_news_list(html):
+    """Parse the nchmf index page into a list of {title, link, time}."""
     news_list = []
-    response = requests.get(url)
-    if response.status_code == 200:
-        soup = BeautifulSoup(response.text, 'html.parser')
+    soup = BeautifulSoup(html, HTML_PARSER)
+
+    news_container = soup.find("div", {"id": "left-col"})
 
-        news_container = soup.find("div", {"id": "left-col"})
+    news_items = news_container.find_all("li")
 
-        news_items = news_container.find_all("li")
 
+    for item in news_items:
+        title = item.find("a").text.strip()
 
-        for item in news_items:
-            title = item.find("a").text.strip()
+        link = item.find("a")["href"]
 
-            link = item.find("a")["href"]
+        time_label = item.find("label").text.strip() if item.find("label") else "Không rõ thời gian"
 
-            time_label = item.find("label").text.strip() if item.find("label") else "Không rõ thời gian"
 
+        news_list.append({
+            "title": title,
+            "link": link,
+            "time": time_label,
+        })
 
-            news_list.append({
-                "title": title,
-                "link": link,
-                "time": time_label,
-            })
-            
     return news_list
 
 
-def extract_text_recursively(element):
-    """Hàm đệ quy để trích xuất văn bản từ một phần tử HTML, tránh các thẻ <script>."""
-    text = ""
-    for child in element.children:
-        if child.name:  # Nếu là thẻ HTML
+def parse_news_page(html, url):
+    """
+    Parse a news page into (absolute PDF links, article text).
+
+    The article text is None when the page links PDFs (the bulletin is in the
+    PDF) or has no 'content-news' element.
+    """
+    soup = BeautifulSoup(html, HTML_PARSER)
+
+    pdf_links = soup.find_all('a', href=lambda href: href and href.endswith('.pdf'))
+    if len(pdf_links) > 0:
+        # Nếu là đường dẫn tương đối thì ghép với url của trang
+        return [urljoin(url, link['href']) for link in pdf_links], None
+
+    content_news = soup.find(class_='content-news')
+    if content_news:
+        return [], extract_text(content_news)
+
+    print("No element with class 'content-news' found.")
+    return [], None
+
+
+def crawl_nchmf():
+    # Goes through the async crawler so the index page is served from the
+    # HTTP cache when it has not changed
+    return asyncio.run(acrawl_nchmf())
+
+
+# Tags that start a new line of extracted text; anything else is inline
+BLOCK_TAGS = frozenset({
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl',
+    'dt', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4',
+    'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre',
+    'section', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'ul',
+})
+
+
+def _flush_line(parts):
+    """Join the buffered text nodes of one line, collapsing whitespace."""
+    text = " ".join("".join(parts).split())
+    parts.clear()
+    if text:
+        yield text
+
+
+def iter_text(element):
+    """
+    Yield the lines of text under element in document order. Text inside
+    inline tags is joined into one line (<p>Tin <b>bão</b> số 3</p> gives
+    "Tin bão số 3") and a new line starts at each block-level tag or <br>.
+    Skips <script> tags and comments. Walks the tree with an explicit stack,
+    so deeply nested pages cannot hit the recursion limit.
+    """
+    parts = []
+    stack = [(iter(element.children), False)]
+    while stack:
+        children, is_block = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            if is_block:
+                yield from _flush_line(parts)
+        elif child.name:  # Nếu là thẻ HTML
             if child.name == 'script':  # Bỏ qua thẻ <script>
                 continue
-            text += extract_text_recursively(child)
-        elif isinstance(child, str):  # Nếu là chuỗi văn bản
-            text += child.strip() + "\n"
-    return text.strip()
+            is_block = child.name in BLOCK_TAGS
+            if is_block:
+                yield from _flush_line(parts)
+            stack.append((iter(child.children), is_block))
+        elif isinstance(child, NavigableString) and not isinstance(
+            child, PreformattedString
+        ):
+            parts.append(child)
+    yield from _flush_line(parts)
+
+
+def extract_text(element):
+    """Trích xuất văn bản từ một phần tử HTML, mỗi khối (đoạn, dòng bảng...) một dòng."""
+    return "\n".join(iter_text(element))
+
+
+async def _aextract_from_page(crawler, page):
+    if not page.ok:
+        print(f"Failed to fetch the page {page.url}: {page.error}")
+        return None
+
+    pdf_urls, text = await _aparse(parse_news_page, page.text, page.url)
+    for pdf_url in pdf_urls:
+        pdf = await crawler.fetch(pdf_url)
+        if pdf.ok:
+            return await run_blocking(extract_text_from_pdf, pdf.content)
+        print(f"Failed to download PDF {pdf_url}: {pdf.error}")
+    return text
 
-def extract_from_url(url):
-    response = requests.get(url)
-    if response.status_code != 200:
-        print(f"Failed to fetch the page, status code: {response.status_code}")
-        return
 
-    soup = BeautifulSoup(response.text, 'html.parser')
+async def acrawl_nchmf(crawler=None):
+    """Async crawl_nchmf; uses the given crawler's connection pool if any."""
+    if crawler is None:
+        async with AsyncCrawler() as crawler:
+            return await acrawl_nchmf(crawler)
 
-    pdf_links = soup.find_all('a', href=lambda href: href and href.endswith('.pdf'))
+    index = await crawler.fetch(NCHMF_NEWS_URL)
+    if not index.ok:
+        print(f"Failed to fetch the news list: {index.error}")
+        return []
+    return await _aparse(parse_news_list, index.text)
+
+
+async def acrawl_news_documents():
+    """
+    Concurrent crawl_news_documents: all news pages are fetched at once over
+    one pooled client, then their PDFs, keeping the order of the news list.
+    """
+    async with AsyncCrawler() as crawler:
+        news_list = await acrawl_nchmf(crawler)
+        pages = await crawler.fetch_all([news['link'] for news in news_list])
+        texts = await asyncio.gather(
+            *(_aextract_from_page(crawler, page) for page in pages)
+        )
+
+        for timing in crawler.timings():
+            print("Crawl timing", timing)
+
+    documents = {"nchmf:today": f"Hôm nay là ngày {datetime.now().strftime('%d/%m/%Y')}\n\n"}
+    for news, text in zip(news_list, texts, strict=True):
+        if text:
+            documents[f"nchmf:{news['link']}"] = text
+
+    return documents
 
-    if len(pdf_links) > 0:
-        os.makedirs("temp_pdfs", exist_ok=True)
-
-        for link in pdf_links:
-            pdf_url = link['href']
-            if not pdf_url.startswith("http"):  # Nếu là đường dẫn tương đối
-                pdf_url = requests.compat.urljoin(url, pdf_url)
-
-            print(f"Fetching PDF: {pdf_url}")
-            pdf_response = requests.get(pdf_url)
-            if pdf_response.status_code == 200:
-                file_name = os.path.join("temp_pdfs", os.path.basename(pdf_url))
-                with open(file_name, "wb") as pdf_file:
-                    pdf_file.write(pdf_response.content)
-                print(f"Saved PDF: {file_name}")
-
-                text = extract_text_from_pdf(file_name)
-                os.remove(file_name)
-                return text
-            else:
-                print(f"Failed to download PDF: {pdf_url}")
-    else:
-        print("No PDFs found. Extracting text from HTML content.")
-        content_news = soup.find(class_='content-news')
-        if content_news:
-            text = extract_text_recursively(content_news)
-            print("Extracted Text:\n")
-            print(text)
-            return text
-        else:
-            print("No element with class 'content-news' found.")
-            
-    return text
 
-def crawl_all_news():
-    news_list = crawl_nchmf()
-    texts = [f"Hôm nay là ngày {datetime.now().strftime('%d/%m/%Y')}\n\n"]
-    for news in news_list:
-        texts.append(extract_from_url(news['link']))
-    
-    return texts
-        
\ No newline at end of file
+def crawl_news_documents():
+    """Crawl all news keyed by a stable document id (the news link)."""
+    return asyncio.run(acrawl_news_documents())
@@ -1,42 +1,190 @@
-import requests
+import copy
+from datetime import datetime, timedelta
+import json
+import os
 import re
+import threading
+
+import requests
 
 from app.core.config import settings
 
-def get_vndms_warning_list():
-    try:
-        # Gửi request tới API
-        url = f"{settings.STRAPI_URL}/api/vndms-warnings?sort=datetime:desc&pagination[limit]=24"
-        print(url)
-        response = requests.get(url)
-        # response.raise_for_status()  # Kiểm tra lỗi HTTP
+# Regex patterns
+source_regex = re.compile(r"detailrain\(`\d+`,`(.*?)`,\d+\)")
+site_regex = re.compile(r"Mã trạm:\s*<b>(.*?)<\/b>")
+
+
+def _parse_datetime(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _process_item(sub_item):
+    """Trích xuất thông tin từ popupInfo"""
+    popup_info = sub_item.get('popupInfo', '')
+
+    source_match = source_regex.search(popup_info)
+    site_match = site_regex.search(popup_info)
+
+    sub_item['source'] = source_match.group(1) if source_match else None
+    sub_item['stationCode'] = site_match.group(1) if site_match else None
+    return sub_item
+
+
+class VNDMSSync:
+    """
+    Incremental mirror of the Strapi vndms-warnings feed.
 
-        data = response.json().get('data', [])
-        # Regex patterns
-        source_regex = re.compile(r"detailrain\(`\d+`,`(.*?)`,\d+\)")
-        site_regex = re.compile(r"Mã trạm:\s*<b>(.*?)<\/b>")
+    The newest warning per label is kept in a JSON snapshot on disk together
+    with a cursor (the latest record datetime seen) and the ids of the
+    records at that datetime. Each sync asks Strapi for records at or after
+    the cursor, paging forward in datetime order, skips the ids already
+    merged, and runs the popupInfo regexes on the rest alone. Asking for
+    datetime >= cursor rather than > cursor keeps records that share the
+    cursor's datetime but were written after the last sync. The first
+    sync, with no snapshot, takes the latest bootstrap_limit records as the
+    old full fetch did. Labels not updated within retention_hours of the
+    cursor are dropped. A sync merges into a copy of the snapshot, which only
+    replaces the current one once it has been saved.
+    """
 
-        seen_labels = set()  # Sử dụng set để lưu các label đã thấy
+    def __init__(self, path, retention_hours, page_size, bootstrap_limit):
+        self.path = path
+        self.retention = timedelta(hours=retention_hours)
+        self.page_size = page_size
+        self.bootstrap_limit = bootstrap_limit
+        self._lock = threading.Lock()
+        self._snapshot = None
 
-        # Flatten và lọc các object
-        unique_data = []
-        for item in data:
-            for sub_item in item.get('data', []):
-                popup_info = sub_item.get('popupInfo', '')
+    def _url(self):
+        return f"{settings.STRAPI_URL}/api/vndms-warnings"
 
-                # Trích xuất thông tin từ popupInfo
-                source_match = source_regex.search(popup_info)
-                site_match = site_regex.search(popup_info)
+    def _load(self):
+        if self._snapshot is None:
+            try:
+                with open(self.path, encoding="utf-8") as file:
+                    self._snapshot = json.load(file)
+            except (OSError, ValueError):
+                self._snapshot = {"cursor": None, "cursor_ids": [], "labels": {}}
+        return self._snapshot
 
-                sub_item['source'] = source_match.group(1) if source_match else None
-                sub_item['stationCode'] = site_match.group(1) if site_match else None
+    def _save(self, snapshot):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(snapshot, file, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
 
+    def _get(self, params):
+        response = requests.get(
+            self._url(), params=params, timeout=settings.CRAWL_TIMEOUT_SECONDS
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def _fetch_new_records(self, cursor, seen_ids):
+        """Records at or after cursor not in seen_ids, oldest first."""
+        if cursor is None:
+            body = self._get({
+                "sort": "datetime:desc",
+                "pagination[limit]": self.bootstrap_limit,
+            })
+            return list(reversed(body.get('data', [])))
+
+        records = []
+        page = 1
+        while True:
+            body = self._get({
+                "filters[datetime][$gte]": cursor,
+                "sort": "datetime:asc",
+                "pagination[page]": page,
+                "pagination[pageSize]": self.page_size,
+            })
+            records.extend(
+                record for record in body.get('data', [])
+                if record.get('id') not in seen_ids
+            )
+            page_count = body.get('meta', {}).get('pagination', {}).get('pageCount', 1)
+            if page >= page_count:
+                return records
+            page += 1
+
+    def _merge(self, snapshot, records):
+        """Return a new snapshot with records merged into a copy of snapshot."""
+        snapshot = copy.deepcopy(snapshot)
+        labels = snapshot["labels"]
+        cursor = snapshot["cursor"]
+        cursor_ids = set(snapshot.get("cursor_ids", []))
+        for record in records:
+            record_datetime = record.get('datetime')
+            if not record_datetime:
+                continue
+            for sub_item in record.get('data', []):
                 label = sub_item.get('label')
-                if label and label not in seen_labels:
-                    seen_labels.add(label)
-                    unique_data.append(sub_item)
-
-        return unique_data
-    except Exception as e:
-        print(e)
-        return []
+                if not label:
+                    continue
+                current = labels.get(label)
+                # Newer observations replace older ones for the same label
+                if current is None or _parse_datetime(current["datetime"]) <= _parse_datetime(record_datetime):
+                    labels[label] = {
+                        "datetime": record_datetime,
+                        "item": _process_item(sub_item),
+                    }
+            if cursor is None or _parse_datetime(record_datetime) > _parse_datetime(cursor):
+                cursor = record_datetime
+                cursor_ids = set()
+            if _parse_datetime(record_datetime) == _parse_datetime(cursor):
+                cursor_ids.add(record.get('id'))
+
+        if cursor is not None:
+            oldest = _parse_datetime(cursor) - self.retention
+            for label in [
+                label for label, entry in labels.items()
+                if _parse_datetime(entry["datetime"]) < oldest
+            ]:
+                del labels[label]
+        snapshot["cursor"] = cursor
+        snapshot["cursor_ids"] = sorted(
+            record_id for record_id in cursor_ids if record_id is not None
+        )
+        return snapshot
+
+    def sync(self):
+        """
+        Pull new records and return the newest warning per label, newest
+        first. On a failed request the last snapshot is returned.
+        """
+        with self._lock:
+            snapshot = self._load()
+            try:
+                records = self._fetch_new_records(
+                    snapshot["cursor"], set(snapshot.get("cursor_ids", []))
+                )
+                print(f"VNDMS sync: {len(records)} new records since {snapshot['cursor']}")
+                if records:
+                    merged = self._merge(snapshot, records)
+                    self._save(merged)
+                    self._snapshot = snapshot = merged
+            except Exception as e:
+                print(e)
+
+            entries = sorted(
+                snapshot["labels"].values(),
+                key=lambda entry: _parse_datetime(entry["datetime"]),
+                reverse=True,
+            )
+            # Callers reshape the items, so hand out copies
+            return [copy.deepcopy(entry["item"]) for entry in entries]
+
+
+vndms_sync = VNDMSSync(
+    path=settings.VNDMS_SNAPSHOT_PATH,
+    retention_hours=settings.VNDMS_RETENTION_HOURS,
+    page_size=settings.VNDMS_PAGE_SIZE,
+    bootstrap_limit=settings.VNDMS_BOOTSTRAP_LIMIT,
+)
+
+
+def get_vndms_warning_list():
+    return vndms_sync.sync()
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+from app.core.config import settings
+from app.helper.cache_pruner import CachePruner
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    content: bytes
+    encoding: str | None
+    etag: str | None
+    last_modified: str | None
+    content_hash: str
+    fetched_at: float
+
+
+class HTTPCache:
+    """
+    On-disk cache of crawled responses, keyed by URL.
+
+    Each URL has a JSON metadata file (ETag, Last-Modified, content hash,
+    encoding) next to its raw body. The crawler sends the validators as
+    If-None-Match / If-Modified-Since and serves the stored body on a 304, so
+    unchanged pages and PDFs are not downloaded again. Files are written via
+    a temporary file and os.replace, so readers never see a partial entry.
+    Writes periodically prune entries older than max_age_days and, past
+    max_bytes, the least recently written ones.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_age_days: float = settings.HTTP_CACHE_MAX_AGE_DAYS,
+        max_bytes: int = settings.HTTP_CACHE_MAX_BYTES,
+    ):
+        self.directory = directory
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self.pruner = CachePruner()
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.updates = 0
+        self.unchanged = 0
+        self.bytes_saved = 0
+
+    def _paths(self, url: str) -> tuple[str, str]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, key)
+        return f"{base}.json", f"{base}.body"
+
+    @staticmethod
+    def _write(path: str, data: bytes) -> None:
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, url: str) -> CachedResponse | None:
+        meta_path, body_path = self._paths(url)
+        try:
+            with open(meta_path, encoding="utf-8") as file:
+                meta = json.load(file)
+            with open(body_path, "rb") as file:
+                content = file.read()
+            # A body that no longer matches its metadata is treated as missing
+            if hashlib.sha256(content).hexdigest() != meta["content_hash"]:
+                return None
+            return CachedResponse(content=content, **meta)
+        except (OSError, ValueError, KeyError, TypeError):
+            # Missing, unreadable or incomplete entries are cache misses
+            return None
+
+    def put(
+        self, url: str, content: bytes, encoding: str | None, headers: dict[str, str]
+    ) -> None:
+        content_hash = hashlib.sha256(content).hexdigest()
+        meta_path, body_path = self._paths(url)
+        meta = {
+            "url": url,
+            "encoding": encoding,
+            "etag": headers.get("etag"),
+            "last_modified": headers.get("last-modified"),
+            "content_hash": content_hash,
+            "fetched_at": time.time(),
+        }
+
+        try:
+            with open(meta_path, encoding="utf-8") as file:
+                previous_hash = json.load(file)["content_hash"]
+        except (OSError, ValueError, KeyError, TypeError):
+            previous_hash = None
+        if previous_hash != content_hash or not os.path.exists(body_path):
+            self._write(body_path, content)
+            with self._lock:
+                self.updates += 1
+        else:
+            # Same bytes served without validators: only refresh the metadata
+            with self._lock:
+                self.unchanged += 1
+        self._write(meta_path, json.dumps(meta).encode("utf-8"))
+        self.pruner.maybe_prune(self.directory, self.max_age_days, self.max_bytes)
+
+    @staticmethod
+    def conditional_headers(cached: CachedResponse | None) -> dict[str, str]:
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+        return headers
+
+    def record_hit(self, cached: CachedResponse) -> None:
+        with self._lock:
+            self.hits += 1
+            self.bytes_saved += len(cached.content)
+
+    def record_miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "updates": self.updates,
+                "unchanged": self.unchanged,
+                "bytes_saved": self.bytes_saved,
+                "pruned": self.pruner.pruned,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+http_cache = HTTPCache(settings.HTTP_CACHE_DIR) if settings.HTTP_CACHE_ENABLED else None
@@ -1,8 +1,90 @@
+import hashlib
+import os
+import threading
+from io import BytesIO
+
 from PyPDF2 import PdfReader
 
-def extract_text_from_pdf(file_path):
-    reader = PdfReader(file_path)
-    all_text = ""
-    for page in reader.pages:
-        all_text += page.extract_text() + "\n"
-    return all_text
+from app.core.config import settings
+from app.core.executor import get_process_executor
+from app.helper.cache_pruner import CachePruner
+
+_cache_lock = threading.Lock()
+_cache_pruner = CachePruner()
+pdf_text_stats = {"cache_hits": 0, "parsed": 0, "pages": 0, "pruned": 0}
+
+
+def _extract_pages(content: bytes, start: int, stop: int) -> list[str]:
+    """Extract the text of pages [start, stop); runs in a worker process."""
+    pages = PdfReader(BytesIO(content)).pages
+    return [pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _parse(content: bytes) -> str:
+    page_count = len(PdfReader(BytesIO(content)).pages)
+    executor = get_process_executor()
+
+    if executor is None or page_count < settings.PDF_PARALLEL_MIN_PAGES:
+        texts = _extract_pages(content, 0, page_count)
+    else:
+        # One contiguous slice of pages per worker keeps page order trivial
+        workers = settings.PROCESS_EXECUTOR_WORKERS
+        step = -(-page_count // workers)
+        futures = [
+            executor.submit(_extract_pages, content, start, min(start + step, page_count))
+            for start in range(0, page_count, step)
+        ]
+        texts = [text for future in futures for text in future.result()]
+
+    with _cache_lock:
+        pdf_text_stats["parsed"] += 1
+        pdf_text_stats["pages"] += page_count
+    return "\n".join(texts) + "\n" if texts else ""
+
+
+def _cache_path(content_hash: str) -> str:
+    return os.path.join(settings.PDF_TEXT_CACHE_DIR, f"{content_hash}.txt")
+
+
+def extract_text_from_pdf(source):
+    """
+    Extract the text of a PDF given as raw bytes or a file path.
+
+    Text is cached on disk by the SHA-256 of the PDF bytes, so a bulletin
+    that has already been parsed is never parsed again. Documents with at
+    least PDF_PARALLEL_MIN_PAGES pages are split across the process pool.
+    Writes periodically prune texts older than PDF_TEXT_CACHE_MAX_AGE_DAYS
+    and, past PDF_TEXT_CACHE_MAX_BYTES, the least recently written ones.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as file:
+            source = file.read()
+
+    content_hash = hashlib.sha256(source).hexdigest()
+    path = _cache_path(content_hash)
+    try:
+        with open(path, encoding="utf-8") as file:
+            text = file.read()
+        with _cache_lock:
+            pdf_text_stats["cache_hits"] += 1
+        return text
+    except OSError:
+        pass
+
+    text = _parse(source)
+
+    os.makedirs(settings.PDF_TEXT_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        file.write(text)
+    os.replace(tmp_path, path)
+
+    pruned = _cache_pruner.maybe_prune(
+        settings.PDF_TEXT_CACHE_DIR,
+        settings.PDF_TEXT_CACHE_MAX_AGE_DAYS,
+        settings.PDF_TEXT_CACHE_MAX_BYTES,
+    )
+    if pruned:
+        with _cache_lock:
+            pdf_text_stats["pruned"] += pruned
+    return text
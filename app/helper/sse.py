@@ -0,0 +1,20 @@
+import json
+from typing import Any, AsyncIterator
+
+# Response headers for event streams: no caching, and no buffering in nginx
+# (X-Accel-Buffering), so each event reaches the client as it is sent
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Format one Server-Sent Events message with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def sse_stream(events: AsyncIterator[tuple[str, Any]]) -> AsyncIterator[str]:
+    """Turn (event, data) pairs into SSE messages, reporting failures as events."""
+    try:
+        async for event, data in events:
+            yield format_sse(event, data)
+    except Exception as e:
+        yield format_sse("error", {"detail": str(e)})
@@ -0,0 +1,79 @@
+import threading
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """
+    Per-chatbot cache of answers keyed by question embedding.
+
+    A lookup hits when a cached question of the same chatbot_id lies within
+    max_distance (cosine distance) of the new question. Each chatbot's entries
+    are tied to the index version they were answered from and are dropped as
+    soon as a different version is seen, i.e. when the index is rebuilt.
+    """
+
+    def __init__(self, max_distance: float, max_entries: int):
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        # chatbot_id -> (index version, unit question vectors, answers)
+        self._buckets: dict[str, tuple[object, np.ndarray, list[dict]]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _normalize(vector: list[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+    def get(self, chatbot_id: str, version: object, vector: list[float]) -> dict | None:
+        with self._lock:
+            bucket = self._buckets.get(chatbot_id)
+            if bucket is not None and bucket[0] != version:
+                del self._buckets[chatbot_id]
+                self.invalidations += 1
+                bucket = None
+            if bucket is None or not bucket[2]:
+                self.misses += 1
+                return None
+
+            distances = 1.0 - bucket[1] @ self._normalize(vector)
+            best = int(np.argmin(distances))
+            if distances[best] > self.max_distance:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return dict(bucket[2][best])
+
+    def put(
+        self, chatbot_id: str, version: object, vector: list[float], answer: dict
+    ) -> None:
+        unit = self._normalize(vector)[np.newaxis, :]
+        with self._lock:
+            bucket = self._buckets.get(chatbot_id)
+            if bucket is None or bucket[0] != version:
+                self._buckets[chatbot_id] = (version, unit, [dict(answer)])
+                return
+            vectors = np.vstack([bucket[1], unit])[-self.max_entries :]
+            answers = [*bucket[2], dict(answer)][-self.max_entries :]
+            self._buckets[chatbot_id] = (version, vectors, answers)
+
+    def invalidate(self, chatbot_id: str) -> None:
+        with self._lock:
+            if self._buckets.pop(chatbot_id, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": sum(len(bucket[2]) for bucket in self._buckets.values()),
+                "max_distance": self.max_distance,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,64 @@
+import httpx
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+from app.core.config import settings
+
+
+def _http2_enabled() -> bool:
+    if not settings.LLM_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        print("LLM_HTTP2 is set but the h2 package is not installed, using HTTP/1.1")
+        return False
+    return True
+
+
+class LLMClientFactory:
+    """
+    Owns the pooled HTTP clients shared by every OpenAI chat and embedding
+    client in the worker, so connections and TLS sessions are reused across
+    OpenAIModel, EOPService and TaskService.
+    """
+
+    def __init__(self):
+        limits = httpx.Limits(
+            max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+        )
+        timeout = httpx.Timeout(
+            settings.LLM_HTTP_TIMEOUT, connect=settings.LLM_HTTP_CONNECT_TIMEOUT
+        )
+        http2 = _http2_enabled()
+        self.http_client = httpx.Client(limits=limits, timeout=timeout, http2=http2)
+        self.http_async_client = httpx.AsyncClient(
+            limits=limits, timeout=timeout, http2=http2
+        )
+
+    def chat_model(self, model_name: str, **kwargs) -> ChatOpenAI:
+        # Streamed responses only carry token usage when asked for it
+        kwargs.setdefault("stream_usage", True)
+        return ChatOpenAI(
+            model_name=model_name,
+            openai_api_key=settings.OPENAI_API_KEY,
+            http_client=self.http_client,
+            http_async_client=self.http_async_client,
+            **kwargs,
+        )
+
+    def embeddings(self, model: str) -> OpenAIEmbeddings:
+        return OpenAIEmbeddings(
+            openai_api_key=settings.OPENAI_API_KEY,
+            model=model,
+            http_client=self.http_client,
+            http_async_client=self.http_async_client,
+        )
+
+    async def aclose(self) -> None:
+        await self.http_async_client.aclose()
+        self.http_client.close()
+
+
+client_factory = LLMClientFactory()
@@ -0,0 +1,126 @@
+from langchain_core.documents import Document
+
+from app.llm.tokens import count_tokens, truncate_tokens
+
+
+def _overlap(left: str, right: str, min_overlap: int) -> int:
+    """Length of the longest suffix of left that is a prefix of right."""
+    if len(left) < min_overlap or len(right) < min_overlap:
+        return 0
+    probe = right[:min_overlap]
+    position = left.find(probe)
+    while position != -1:
+        if right.startswith(left[position:]):
+            return len(left) - position
+        position = left.find(probe, position + 1)
+    return 0
+
+
+def _shingles(text: str) -> set[tuple[str, ...]]:
+    words = text.lower().split()
+    return {tuple(words[i : i + 3]) for i in range(max(len(words) - 2, 1))}
+
+
+def _jaccard(left: set, right: set) -> float:
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+class ContextAssembler:
+    """
+    Turns retrieval hits into a compact prompt context.
+
+    Overlapping neighbouring chunks (the splitter overlaps them by design) are
+    merged back into contiguous segments, segments are picked MMR-style
+    (relevance traded off against word-shingle overlap with what is already
+    selected), and selection stops at a token budget counted with the chat
+    model's tokenizer. A segment that does not fit in what is left of the
+    budget is cut to fit rather than skipped, so the top-ranked segment is
+    always part of the context even when it alone exceeds the budget.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        token_budget: int,
+        mmr_lambda: float,
+        min_overlap: int = 50,
+    ):
+        self.model_name = model_name
+        self.token_budget = token_budget
+        self.mmr_lambda = mmr_lambda
+        self.min_overlap = min_overlap
+
+    def merge_overlapping(
+        self, results: list[tuple[Document, float]]
+    ) -> list[tuple[str, float]]:
+        """Merge hits into (text, relevance) segments, most relevant first."""
+        segments: list[list] = []
+        for doc, distance in sorted(results, key=lambda result: result[1]):
+            text = doc.page_content.strip()
+            relevance = 1.0 / (1.0 + distance)
+            for segment in segments:
+                if text in segment[0]:
+                    break
+                if segment[0] in text:
+                    segment[0] = text
+                    break
+                overlap = _overlap(segment[0], text, self.min_overlap)
+                if overlap:
+                    segment[0] += text[overlap:]
+                    break
+                overlap = _overlap(text, segment[0], self.min_overlap)
+                if overlap:
+                    segment[0] = text + segment[0][overlap:]
+                    break
+            else:
+                segments.append([text, relevance])
+        return [(text, relevance) for text, relevance in segments]
+
+    def assemble(self, results: list[tuple[Document, float]]) -> tuple[str, dict]:
+        segments = self.merge_overlapping(results)
+        shingles = [_shingles(text) for text, _ in segments]
+        tokens = [count_tokens(text, self.model_name) for text, _ in segments]
+
+        selected: list[int] = []
+        texts: list[str] = []
+        remaining = set(range(len(segments)))
+        used_tokens = 0
+        truncated = 0
+        while remaining and used_tokens < self.token_budget:
+            best, best_score = None, None
+            for i in remaining:
+                redundancy = max(
+                    (_jaccard(shingles[i], shingles[j]) for j in selected),
+                    default=0.0,
+                )
+                score = (
+                    self.mmr_lambda * segments[i][1]
+                    - (1 - self.mmr_lambda) * redundancy
+                )
+                if best_score is None or score > best_score:
+                    best, best_score = i, score
+            remaining.discard(best)
+
+            text, text_tokens = segments[best][0], tokens[best]
+            budget_left = self.token_budget - used_tokens
+            if text_tokens > budget_left:
+                text = truncate_tokens(text, budget_left, self.model_name)
+                text_tokens = count_tokens(text, self.model_name)
+                truncated += 1
+            if not text:
+                break
+            selected.append(best)
+            texts.append(text)
+            used_tokens += text_tokens
+
+        context = "\n".join(texts)
+        stats = {
+            "hits": len(results),
+            "segments": len(segments),
+            "selected": len(selected),
+            "truncated": truncated,
+            "tokens": used_tokens,
+        }
+        return context, stats
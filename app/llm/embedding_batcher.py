@@ -0,0 +1,70 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.embeddings import Embeddings
+
+from app.llm.tokens import count_tokens
+
+
+class BatchedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that packs documents into token-bounded batches and
+    embeds several batches concurrently.
+    """
+
+    def __init__(
+        self,
+        embedding: Embeddings,
+        model_name: str,
+        max_tokens_per_batch: int,
+        max_batch_size: int,
+        max_concurrency: int,
+    ):
+        self.embedding = embedding
+        self.model_name = model_name
+        self.max_tokens_per_batch = max_tokens_per_batch
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max_concurrency
+
+    def make_batches(self, texts: list[str]) -> tuple[list[list[str]], int]:
+        """Greedily pack texts, in order, into batches under the token limit."""
+        batches: list[list[str]] = []
+        batch: list[str] = []
+        batch_tokens = 0
+        total_tokens = 0
+        for text in texts:
+            tokens = count_tokens(text, self.model_name)
+            total_tokens += tokens
+            if batch and (
+                batch_tokens + tokens > self.max_tokens_per_batch
+                or len(batch) >= self.max_batch_size
+            ):
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            batch.append(text)
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches, total_tokens
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+
+        start = time.perf_counter()
+        batches, total_tokens = self.make_batches(texts)
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_concurrency, len(batches))
+        ) as executor:
+            results = list(executor.map(self.embedding.embed_documents, batches))
+        elapsed = max(time.perf_counter() - start, 1e-9)
+
+        print(
+            f"Embedded {len(texts)} chunks ({total_tokens} tokens) in "
+            f"{len(batches)} batches, {elapsed:.2f}s: "
+            f"{len(texts) / elapsed:.1f} chunks/s, {total_tokens / elapsed:.1f} tokens/s"
+        )
+        return [vector for result in results for vector in result]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embedding.embed_query(text)
@@ -0,0 +1,106 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import unicodedata
+from array import array
+
+from langchain_core.embeddings import Embeddings
+
+
+def chunk_hash(text: str) -> str:
+    normalized = unicodedata.normalize("NFC", text).strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    On-disk, content-addressed store of document embeddings.
+
+    Vectors are keyed by (model name, hash of the normalized chunk) and stored
+    as float32 blobs in SQLite, so unchanged chunks are never sent to the
+    embedding API twice, across runs and across workers.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, "
+                "hash TEXT NOT NULL, "
+                "vector BLOB NOT NULL, "
+                "PRIMARY KEY (model, hash))"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, model: str, hashes: list[str]) -> dict[str, list[float]]:
+        found = {}
+        conn = self._connection()
+        # Stay well below SQLite's bound-parameter limit
+        for start in range(0, len(hashes), 500):
+            batch = hashes[start : start + 500]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(
+                f"SELECT hash, vector FROM embeddings "
+                f"WHERE model = ? AND hash IN ({placeholders})",
+                [model, *batch],
+            )
+            for hash_, blob in rows:
+                found[hash_] = array("f", blob).tolist()
+        return found
+
+    def put_many(self, model: str, items: dict[str, list[float]]) -> None:
+        with self._connection() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, hash, vector) "
+                "VALUES (?, ?, ?)",
+                [
+                    (model, hash_, array("f", vector).tobytes())
+                    for hash_, vector in items.items()
+                ],
+            )
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that consults an EmbeddingCache before the backend."""
+
+    def __init__(self, embedding: Embeddings, model_name: str, cache: EmbeddingCache):
+        self.embedding = embedding
+        self.model_name = model_name
+        self.cache = cache
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        hashes = [chunk_hash(text) for text in texts]
+        found = self.cache.get_many(self.model_name, list(set(hashes)))
+
+        missing = {}
+        for text, hash_ in zip(texts, hashes, strict=True):
+            if hash_ not in found and hash_ not in missing:
+                missing[hash_] = text
+
+        if missing:
+            vectors = self.embedding.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors, strict=True))
+            self.cache.put_many(self.model_name, computed)
+            found.update(computed)
+
+        print(
+            f"Embedding cache: {len(texts) - len(missing)} hits, "
+            f"{len(missing)} misses"
+        )
+        return [found[hash_] for hash_ in hashes]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embedding.embed_query(text)
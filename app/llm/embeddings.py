@@ -0,0 +1,89 @@
+from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_core.embeddings import Embeddings
+
+from app.core.config import settings
+from app.llm.clients import client_factory
+from app.llm.rate_limiter import Priority, rate_limiter
+from app.llm.tokens import count_tokens
+
+
+class RateLimitedEmbeddings(Embeddings):
+    """Embeddings wrapper that draws every API call from the shared rate limiter."""
+
+    def __init__(self, embedding: Embeddings, model_name: str, priority: Priority):
+        self.embedding = embedding
+        self.model_name = model_name
+        self.priority = priority
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        tokens = sum(count_tokens(text, self.model_name) for text in texts)
+        rate_limiter.acquire(self.model_name, tokens, self.priority)
+        return self.embedding.embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        tokens = count_tokens(text, self.model_name)
+        rate_limiter.acquire(self.model_name, tokens, self.priority)
+        return self.embedding.embed_query(text)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        tokens = sum(count_tokens(text, self.model_name) for text in texts)
+        await rate_limiter.aacquire(self.model_name, tokens, self.priority)
+        return await self.embedding.aembed_documents(texts)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        tokens = count_tokens(text, self.model_name)
+        await rate_limiter.aacquire(self.model_name, tokens, self.priority)
+        return await self.embedding.aembed_query(text)
+
+
+def embedding_model_name() -> str:
+    """
+    Name identifying the vectors create_embedding produces, used to key the
+    embedding cache. Local models include the ONNX export they run through,
+    since a quantized export yields different vectors than the torch model.
+    """
+    if settings.EMBEDDING_BACKEND != "local":
+        return settings.OPENAI_EMBEDDING_MODEL
+    if settings.LOCAL_EMBEDDING_ONNX:
+        variant = settings.LOCAL_EMBEDDING_ONNX_FILE or "onnx/model.onnx"
+        return f"{settings.LOCAL_EMBEDDING_MODEL}:onnx:{variant}"
+    return settings.LOCAL_EMBEDDING_MODEL
+
+
+def create_embedding() -> Embeddings:
+    """
+    Create the embedding backend selected by EMBEDDING_BACKEND.
+
+    "openai" calls the OpenAI embeddings API. "local" runs a multilingual
+    sentence-transformers model in-process with batched CPU inference,
+    optionally through a quantized ONNX export and a pool of worker processes.
+    """
+    if settings.EMBEDDING_BACKEND != "local":
+        return RateLimitedEmbeddings(
+            client_factory.embeddings(settings.OPENAI_EMBEDDING_MODEL),
+            settings.OPENAI_EMBEDDING_MODEL,
+            Priority.CHAT,
+        )
+
+    if settings.LOCAL_EMBEDDING_THREADS > 0:
+        import torch
+
+        torch.set_num_threads(settings.LOCAL_EMBEDDING_THREADS)
+
+    model_kwargs = {"device": settings.LOCAL_EMBEDDING_DEVICE}
+    if settings.LOCAL_EMBEDDING_ONNX:
+        model_kwargs["backend"] = "onnx"
+        if settings.LOCAL_EMBEDDING_ONNX_FILE:
+            model_kwargs["model_kwargs"] = {
+                "file_name": settings.LOCAL_EMBEDDING_ONNX_FILE
+            }
+
+    return HuggingFaceEmbeddings(
+        model_name=settings.LOCAL_EMBEDDING_MODEL,
+        model_kwargs=model_kwargs,
+        encode_kwargs={
+            "batch_size": settings.LOCAL_EMBEDDING_BATCH_SIZE,
+            "normalize_embeddings": True,
+        },
+        multi_process=settings.LOCAL_EMBEDDING_MULTI_PROCESS,
+    )
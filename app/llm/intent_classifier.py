@@ -0,0 +1,259 @@
+import threading
+import time
+import unicodedata
+from typing import Callable
+
+import numpy as np
+
+from app.llm.prompts import INSUFFICIENT_DATA_ANSWER, OFF_TOPIC_ANSWER, SHELTER_ANSWER
+
+SHELTER = "shelter"
+OFF_TOPIC = "off_topic"
+EMPTY = "empty"
+DISASTER = "disaster"
+
+CANNED_ANSWERS = {
+    SHELTER: SHELTER_ANSWER,
+    OFF_TOPIC: OFF_TOPIC_ANSWER,
+    EMPTY: INSUFFICIENT_DATA_ANSWER,
+}
+
+# Phrases are matched on whole words of the accent-stripped question
+SHELTER_PHRASES = (
+    "noi tru an",
+    "cho tru an",
+    "cho an nau",
+    "diem tru an",
+    "tron o dau",
+    "di dau de an toan",
+    "di dau cho an toan",
+    "tranh bao o dau",
+    "tranh lu o dau",
+    "so tan di dau",
+    "so tan den dau",
+    "diem so tan",
+)
+
+DISASTER_PHRASES = (
+    "thien tai",
+    "bao",
+    "ap thap",
+    "lu",
+    "lut",
+    "ngap",
+    "mua",
+    "gio",
+    "loc",
+    "set",
+    "dong dat",
+    "song than",
+    "sat lo",
+    "han han",
+    "nang nong",
+    "ret",
+    "suong muoi",
+    "chay rung",
+    "trieu cuong",
+    "xam nhap man",
+    "vo de",
+    "ho chua",
+    "thoi tiet",
+    "khi tuong",
+    "thuy van",
+    "nhiet do",
+    "canh bao",
+    "khan cap",
+    "cuu ho",
+    "cuu nan",
+    "so tan",
+    "an toan",
+)
+
+OFF_TOPIC_PHRASES = (
+    "bong da",
+    "nau an",
+    "mon an",
+    "cong thuc nau",
+    "lap trinh",
+    "viet code",
+    "python",
+    "javascript",
+    "bai hat",
+    "ca si",
+    "phim",
+    "chung khoan",
+    "co phieu",
+    "gia vang",
+    "bitcoin",
+    "tien ao",
+    "xo so",
+    "nguoi yeu",
+    "tu vi",
+    "cung hoang dao",
+    "giai toan",
+    "lam tho",
+    "khach san",
+    "game",
+)
+
+# Labelled questions for the optional nearest-neighbour check. DISASTER
+# examples only act as counterweights and are never answered locally.
+LABELLED_EXAMPLES = (
+    ("Tôi nên trú ẩn ở đâu khi có bão?", SHELTER),
+    ("Gần nhà tôi có chỗ nào để tránh lũ không?", SHELTER),
+    ("Nếu nước dâng cao thì gia đình tôi nên chạy đi đâu?", SHELTER),
+    ("Chỗ nào an toàn để ở lại trong đêm mưa lớn?", SHELTER),
+    ("Cho tôi công thức làm bánh mì", OFF_TOPIC),
+    ("Đội tuyển nào vô địch World Cup?", OFF_TOPIC),
+    ("Viết giúp tôi một bài văn về mùa xuân", OFF_TOPIC),
+    ("Hôm nay giá xăng là bao nhiêu?", OFF_TOPIC),
+    ("Giới thiệu cho tôi vài bộ phim hay", OFF_TOPIC),
+    ("Làm sao để học tiếng Anh nhanh?", OFF_TOPIC),
+    ("Bão số 3 đang di chuyển theo hướng nào?", DISASTER),
+    ("Mực nước sông Hương hiện tại là bao nhiêu?", DISASTER),
+    ("Khu vực nào có nguy cơ sạt lở đất?", DISASTER),
+    ("Ngày mai Đà Nẵng có mưa lớn không?", DISASTER),
+    ("Có cảnh báo lũ quét ở Quảng Nam không?", DISASTER),
+    ("Tôi cần chuẩn bị gì trước khi bão đổ bộ?", DISASTER),
+)
+
+
+def strip_accents(text: str) -> str:
+    """Lowercase and remove Vietnamese diacritics, keeping only words."""
+    decomposed = unicodedata.normalize("NFD", text.casefold().replace("đ", "d"))
+    stripped = "".join(c for c in decomposed if unicodedata.category(c) != "Mn")
+    return " ".join("".join(c if c.isalnum() else " " for c in stripped).split())
+
+
+def _contains_any(padded_text: str, phrases: tuple[str, ...]) -> bool:
+    return any(f" {phrase} " in padded_text for phrase in phrases)
+
+
+class IntentClassifier:
+    """
+    Answers questions whose reply is a fixed sentence without calling the LLM.
+
+    match_rules is a keyword check on the accent-stripped question and runs
+    before anything else. match_examples compares the question vector with a
+    small set of labelled examples (k nearest neighbours by cosine
+    similarity); it is off unless knn_enabled, and the example vectors are
+    embedded once by fit(). Both return the canned answer or None.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        knn_enabled: bool,
+        knn_k: int,
+        knn_min_similarity: float,
+        embed_documents: Callable[[list[str]], list[list[float]]],
+    ):
+        self.enabled = enabled
+        self.knn_enabled = enabled and knn_enabled
+        self.knn_k = knn_k
+        self.knn_min_similarity = knn_min_similarity
+        self.embed_documents = embed_documents
+        self._example_vectors: np.ndarray | None = None
+        self._example_labels = [label for _, label in LABELLED_EXAMPLES]
+        self._lock = threading.Lock()
+        self.checks = 0
+        self.rule_seconds = 0.0
+        self.matches = {SHELTER: 0, OFF_TOPIC: 0, EMPTY: 0}
+        self.knn_matches = 0
+
+    @property
+    def needs_fit(self) -> bool:
+        return self.knn_enabled and self._example_vectors is None
+
+    def fit(self) -> None:
+        """Embed the labelled examples; kNN is disabled if this fails."""
+        with self._lock:
+            if not self.needs_fit:
+                return
+            try:
+                vectors = np.asarray(
+                    self.embed_documents([text for text, _ in LABELLED_EXAMPLES]),
+                    dtype=np.float32,
+                )
+            except Exception as e:
+                print("Intent examples could not be embedded, disabling kNN:", e)
+                self.knn_enabled = False
+                return
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            self._example_vectors = vectors / np.where(norms == 0, 1, norms)
+
+    def _answer(self, intent: str) -> dict:
+        with self._lock:
+            self.matches[intent] += 1
+        return {"answer": CANNED_ANSWERS[intent]}
+
+    def _rule_intent(self, question: str) -> str | None:
+        text = strip_accents(question)
+        if not text:
+            return EMPTY
+
+        padded = f" {text} "
+        if _contains_any(padded, SHELTER_PHRASES):
+            return SHELTER
+        if _contains_any(padded, OFF_TOPIC_PHRASES) and not _contains_any(
+            padded, DISASTER_PHRASES
+        ):
+            return OFF_TOPIC
+        return None
+
+    def match_rules(self, question: str) -> dict | None:
+        if not self.enabled:
+            return None
+
+        started = time.perf_counter()
+        intent = self._rule_intent(question)
+        with self._lock:
+            self.checks += 1
+            self.rule_seconds += time.perf_counter() - started
+        return None if intent is None else self._answer(intent)
+
+    def match_examples(self, vector: list[float]) -> dict | None:
+        if not self.knn_enabled:
+            return None
+        if self._example_vectors is None:
+            self.fit()
+            if self._example_vectors is None:
+                return None
+
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        similarities = self._example_vectors @ query
+        nearest = np.argsort(similarities)[::-1][: self.knn_k]
+        if similarities[nearest[0]] < self.knn_min_similarity:
+            return None
+
+        # Every neighbour above the threshold must agree on the intent
+        labels = {
+            self._example_labels[i]
+            for i in nearest
+            if similarities[i] >= self.knn_min_similarity
+        }
+        if len(labels) != 1:
+            return None
+        intent = labels.pop()
+        if intent == DISASTER:
+            return None
+        with self._lock:
+            self.knn_matches += 1
+        return self._answer(intent)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "knn_enabled": self.knn_enabled,
+                "checks": self.checks,
+                "matches": dict(self.matches),
+                "knn_matches": self.knn_matches,
+                "llm_calls_avoided": sum(self.matches.values()),
+                "avg_rule_ms": (
+                    self.rule_seconds / self.checks * 1000 if self.checks else 0.0
+                ),
+            }
@@ -1,30 +1,98 @@
 import os
 import re
-import os
+import shutil
+from typing import AsyncIterator
 
+from app.core.executor import run_blocking
 from app.helper.pdf import extract_text_from_pdf
+from app.llm.answer_cache import SemanticAnswerCache
+from app.llm.clients import client_factory
+from app.llm.context_assembler import ContextAssembler
+from app.llm.embedding_batcher import BatchedEmbeddings
+from app.llm.embedding_cache import CachedEmbeddings, EmbeddingCache, chunk_hash
+from app.llm.embeddings import create_embedding, embedding_model_name
+from app.llm.intent_classifier import IntentClassifier
+from app.llm.prompts import (
+    INSUFFICIENT_DATA_ANSWER,
+    disaster_expert_messages,
+    general_messages,
+)
+from app.llm.query_cache import QueryEmbeddingCache
+from app.llm.rate_limiter import Priority, rate_limiter
+from app.llm.resilience import ResiliencePolicy
+from app.llm.tokens import count_prompt_tokens
+from app.llm.usage import prompt_cache_stats
+from app.llm.vector_db_cache import VectorDBCache
+from app.llm.vector_index import (
+    IndexSpec,
+    build_faiss_store,
+    load_faiss_store,
+    resident_bytes,
+    save_faiss_store,
+    supports_removal,
+    tune_index,
+)
 from langchain.vectorstores.faiss import FAISS
 from langchain.chains.question_answering import load_qa_chain
 from langchain_community.document_loaders.csv_loader import CSVLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings, OpenAI
 from app.core.config import settings
 
 
 class OpenAIModel:
     def __init__(self):
         self.model_name = "gpt-4o"
-        self.embedding = OpenAIEmbeddings(
-            openai_api_key=settings.OPENAI_API_KEY, model="text-embedding-3-small"
+        self.embedding_model = embedding_model_name()
+        self.embedding = create_embedding()
+        # Used for index builds: unchanged chunks are served from the cache and
+        # the rest are embedded in concurrent, token-bounded batches (the local
+        # backend batches inference itself)
+        build_embedding = self.embedding
+        if settings.EMBEDDING_BACKEND == "openai":
+            build_embedding = BatchedEmbeddings(
+                self.embedding,
+                self.embedding_model,
+                max_tokens_per_batch=settings.EMBEDDING_BATCH_MAX_TOKENS,
+                max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+                max_concurrency=settings.EMBEDDING_MAX_CONCURRENCY,
+            )
+        self.build_embedding = CachedEmbeddings(
+            build_embedding,
+            self.embedding_model,
+            EmbeddingCache(settings.EMBEDDING_CACHE_PATH),
         )
         self.thresh = 0.5
         # Threshold for relevant content (lower score = higher similarity)
         self.similarity_threshold = 0.2
-        self.chat_bot = ChatOpenAI(
-            model_name=self.model_name, openai_api_key=settings.OPENAI_API_KEY
+        self.resilience = ResiliencePolicy.for_chat("chat")
+        # Retries are handled by the resilience policy, not the SDK
+        self.chat_bot = client_factory.chat_model(
+            self.model_name, timeout=self.resilience.timeout, max_retries=0
+        )
+        self.context_assembler = ContextAssembler(
+            model_name=self.model_name,
+            token_budget=settings.CONTEXT_TOKEN_BUDGET,
+            mmr_lambda=settings.CONTEXT_MMR_LAMBDA,
+        )
+        self.vector_db_cache = VectorDBCache(
+            max_entries=settings.VECTOR_DB_CACHE_MAX_ENTRIES,
+            max_bytes=settings.VECTOR_DB_CACHE_MAX_BYTES,
+        )
+        self.query_embedding_cache = QueryEmbeddingCache(
+            max_entries=settings.QUERY_EMBEDDING_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+        )
+        self.answer_cache = SemanticAnswerCache(
+            max_distance=settings.ANSWER_CACHE_MAX_DISTANCE,
+            max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+        )
+        self.intent_classifier = IntentClassifier(
+            enabled=settings.INTENT_CLASSIFIER_ENABLED,
+            knn_enabled=settings.INTENT_KNN_ENABLED,
+            knn_k=settings.INTENT_KNN_K,
+            knn_min_similarity=settings.INTENT_KNN_MIN_SIMILARITY,
+            embed_documents=self.build_embedding.embed_documents,
         )
-        self.client = OpenAI(openai_api_key=settings.OPENAI_API_KEY)
 
     def is_id_exist(self, chatbot_id: str) -> bool:
         directory = "data/vector_dbs"
@@ -39,7 +107,10 @@ class OpenAIModel:
         return None
 
     def build_vector_db(
-        self, chatbot_id: str, data_files: list[dict[str, str]]
+        self,
+        chatbot_id: str,
+        data_files: list[dict[str, str]],
+        index_spec: IndexSpec | None = None,
     ) -> None:
         documents = []
 
@@ -73,156 +144,338 @@ class OpenAIModel:
                     ]
                 )
 
-        faiss = FAISS.from_texts(
-            [doc["text"] for doc in documents], embedding=self.embedding
+        faiss = build_faiss_store(
+            [doc["text"] for doc in documents],
+            self.build_embedding,
+            spec=index_spec,
         )
 
         directory = "data/vector_dbs"
         os.makedirs(directory, exist_ok=True)
-        faiss.save_local(f"{directory}/{chatbot_id}_faiss.index")
+        save_faiss_store(faiss, f"{directory}/{chatbot_id}_faiss.index")
+        self.vector_db_cache.invalidate(chatbot_id)
+        self.answer_cache.invalidate(chatbot_id)
         return faiss
 
-    def build_vector_db_by_text(self, chatbot_id: str, texts: list[str]) -> None:
-        documents = []
-
-        for text in texts:
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000, chunk_overlap=500
-            )
-            texts = text_splitter.split_text(text)
-            documents.extend(
-                [{"text": txt, "metadata": {"chatbot_id": chatbot_id}} for txt in texts]
-            )
+    def split_documents(
+        self, chatbot_id: str, documents: dict[str, str]
+    ) -> tuple[list[str], list[dict], list[str]]:
+        """
+        Split documents into chunks with stable ids.
+
+        Chunk ids are derived from the document id and its content hash, so an
+        unchanged document always yields the same ids across runs.
+        """
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=1000, chunk_overlap=500
+        )
+        texts, metadatas, ids = [], [], []
+        for doc_id, text in documents.items():
+            doc_hash = chunk_hash(text)
+            for i, txt in enumerate(text_splitter.split_text(text)):
+                texts.append(txt)
+                metadatas.append(
+                    {"chatbot_id": chatbot_id, "doc_id": doc_id, "doc_hash": doc_hash}
+                )
+                ids.append(f"{doc_id}#{doc_hash[:16]}#{i}")
+        return texts, metadatas, ids
 
-        faiss = FAISS.from_texts(
-            [doc["text"] for doc in documents], embedding=self.embedding
+    def build_vector_db_by_text(
+        self, chatbot_id: str, texts: list[str], index_spec: IndexSpec | None = None
+    ) -> None:
+        documents = {f"text:{chunk_hash(text)}": text for text in texts}
+        return self.build_vector_db_by_documents(chatbot_id, documents, index_spec)
+
+    def build_vector_db_by_documents(
+        self,
+        chatbot_id: str,
+        documents: dict[str, str],
+        index_spec: IndexSpec | None = None,
+    ) -> FAISS:
+        texts, metadatas, ids = self.split_documents(chatbot_id, documents)
+        faiss = build_faiss_store(
+            texts,
+            self.build_embedding,
+            metadatas=metadatas,
+            ids=ids,
+            spec=index_spec,
         )
 
         directory = "data/vector_dbs"
         os.makedirs(directory, exist_ok=True)
-        faiss.save_local(f"{directory}/{chatbot_id}_faiss.index")
+        save_faiss_store(faiss, f"{directory}/{chatbot_id}_faiss.index")
+        self.vector_db_cache.invalidate(chatbot_id)
+        self.answer_cache.invalidate(chatbot_id)
         return faiss
 
+    def update_vector_db(self, chatbot_id: str, documents: dict[str, str]) -> dict:
+        """
+        Incrementally sync an index with the given documents.
+
+        Only new or changed documents are embedded and added; chunks of
+        changed or withdrawn documents are removed by id. Falls back to a full
+        build when the index does not exist yet or predates document ids.
+        """
+        full_build = {
+            "added": len(documents),
+            "updated": 0,
+            "removed": 0,
+            "unchanged": 0,
+        }
+        if not self.is_id_exist(chatbot_id):
+            self.build_vector_db_by_documents(chatbot_id, documents)
+            return full_build
+
+        directory = "data/vector_dbs"
+        path = f"{directory}/{chatbot_id}_faiss.index"
+        # Load a private copy: the cached instance may be serving searches
+        faiss = load_faiss_store(path, self.build_embedding, mmap=False)
+
+        indexed: dict[str, tuple[str, list[str]]] = {}
+        for chunk_id, doc in faiss.docstore._dict.items():
+            doc_id = doc.metadata.get("doc_id")
+            if doc_id is None:
+                print("Index has no document ids, rebuilding", chatbot_id)
+                self.build_vector_db_by_documents(chatbot_id, documents)
+                return full_build
+            indexed.setdefault(doc_id, (doc.metadata.get("doc_hash"), []))
+            indexed[doc_id][1].append(chunk_id)
+
+        changed = {
+            doc_id: text
+            for doc_id, text in documents.items()
+            if doc_id not in indexed or indexed[doc_id][0] != chunk_hash(text)
+        }
+        removed = [
+            doc_id
+            for doc_id in indexed
+            if doc_id not in documents or doc_id in changed
+        ]
+        summary = {
+            "added": len([doc_id for doc_id in changed if doc_id not in indexed]),
+            "updated": len([doc_id for doc_id in changed if doc_id in indexed]),
+            "removed": len([doc_id for doc_id in removed if doc_id not in changed]),
+            "unchanged": len(documents) - len(changed),
+        }
+
+        stale_ids = [
+            chunk_id for doc_id in removed for chunk_id in indexed[doc_id][1]
+        ]
+        if stale_ids and not supports_removal(faiss.index):
+            # Unchanged chunks come from the embedding cache, so a rebuild
+            # only embeds what changed
+            print("Index does not support removal, rebuilding", chatbot_id)
+            self.build_vector_db_by_documents(chatbot_id, documents)
+            return summary
+
+        if stale_ids:
+            faiss.delete(stale_ids)
+        if changed:
+            texts, metadatas, ids = self.split_documents(chatbot_id, changed)
+            faiss.add_texts(texts, metadatas=metadatas, ids=ids)
+
+        if stale_ids or changed:
+            save_faiss_store(faiss, path)
+            self.vector_db_cache.invalidate(chatbot_id)
+            self.answer_cache.invalidate(chatbot_id)
+
+        print("Incremental update", chatbot_id, summary)
+        return summary
+
     def load_vector_db(self, chatbot_id: str):
         directory = "data/vector_dbs"
-        faiss = FAISS.load_local(
-            f"{directory}/{chatbot_id}_faiss.index",
-            embeddings=self.embedding,
-            allow_dangerous_deserialization=True,
+        path = f"{directory}/{chatbot_id}_faiss.index"
+        return self.vector_db_cache.get_or_load(
+            chatbot_id,
+            path,
+            lambda: self._load_tuned(path),
+            size_of=lambda store: resident_bytes(path, store.index),
         )
+
+    def _load_tuned(self, path: str) -> FAISS:
+        faiss = load_faiss_store(path, self.embedding, mmap=settings.VECTOR_DB_MMAP)
+        tune_index(faiss.index, IndexSpec.from_settings())
         return faiss
 
     def delete_vector_db(self, chatbot_id: str):
         directory = "data/vector_dbs"
-        os.remove(f"{directory}/{chatbot_id}_faiss.index")
+        path = f"{directory}/{chatbot_id}_faiss.index"
+        self.vector_db_cache.invalidate(chatbot_id)
+        self.answer_cache.invalidate(chatbot_id)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+    def embed_question(self, question: str) -> list[float]:
+        return self.query_embedding_cache.get_or_embed(
+            question, self.embedding.embed_query
+        )
+
+    async def aembed_question(self, question: str) -> list[float]:
+        vector = self.query_embedding_cache.get(question)
+        if vector is None:
+            vector = await self.embedding.aembed_query(question)
+            self.query_embedding_cache.put(question, vector)
+        return vector
+
+    def cache_stats(self) -> dict:
+        return {
+            "vector_db": self.vector_db_cache.stats(),
+            "query_embedding": self.query_embedding_cache.stats(),
+            "answer": self.answer_cache.stats(),
+            "resilience": self.resilience.stats(),
+            "intent": self.intent_classifier.stats(),
+        }
+
+    def _estimate_tokens(self, prompt) -> int:
+        return (
+            count_prompt_tokens(prompt, self.model_name)
+            + settings.RATE_LIMIT_COMPLETION_TOKENS
+        )
+
+    def complete(self, prompt, priority: Priority = Priority.CHAT) -> str:
+        message = self.resilience.invoke(
+            self.chat_bot,
+            prompt,
+            self.model_name,
+            self._estimate_tokens(prompt),
+            priority,
+        )
+        return message.content
+
+    async def acomplete(self, prompt, priority: Priority = Priority.CHAT) -> str:
+        message = await self.resilience.ainvoke(
+            self.chat_bot,
+            prompt,
+            self.model_name,
+            self._estimate_tokens(prompt),
+            priority,
+        )
+        return message.content
+
+    async def astream_completion(
+        self, prompt, priority: Priority = Priority.CHAT
+    ) -> AsyncIterator[str]:
+        await rate_limiter.aacquire(
+            self.model_name, self._estimate_tokens(prompt), priority
+        )
+        async for chunk in self.chat_bot.astream(prompt):
+            # Usage arrives on the final, content-less chunk
+            if chunk.usage_metadata:
+                prompt_cache_stats.record(self.model_name, chunk)
+            if chunk.content:
+                yield chunk.content
+
+    def prepare_faiss_prompt(
+        self, faiss: FAISS, question: str, question_vector: list[float]
+    ) -> tuple[str, list[dict] | None]:
+        """
+        Search the index and build the prompt for a question.
+
+        Returns (kind, prompt) where kind is "context" when retrieved data was
+        found, "fallback" when the index returned nothing, and "no_context"
+        (with no prompt) when all hits were filtered out.
+        """
+        # Use provided threshold or default
+        # threshold = (
+        #     similarity_threshold
+        #     if similarity_threshold is not None
+        #     else self.similarity_threshold
+        # )
+
+        # Get similarity search results with scores
+        results = faiss.similarity_search_with_score_by_vector(
+            question_vector, k=settings.CONTEXT_FETCH_K
+        )
+        print("results", results)
+
+        if results:
+            # Filter by similarity threshold (lower = higher similarity)
+            # filtered_results = [
+            #     (result, score) for result, score in results if score < threshold
+            # ]
+            filtered_results = results
+
+            # Sort by similarity score (ascending, so most similar first)
+            # filtered_results = sorted(filtered_results, key=lambda x: x[1])
+
+            if filtered_results:
+                context, context_stats = self.context_assembler.assemble(
+                    filtered_results
+                )
+                print(f"Found {len(filtered_results)} relevant contexts")
+                print("context", context_stats)
+                return "context", disaster_expert_messages(context, question)
+            else:
+                print("No relevant contexts found based on threshold")
+                return "no_context", None
+
+        # Fallback: if no FAISS results, ask general question with context
+        return "fallback", general_messages(question)
+
+    def finalize_answer(self, kind: str, raw_answer: str | None) -> dict:
+        if kind == "no_context":
+            return {"answer": INSUFFICIENT_DATA_ANSWER}
+
+        clean_answer = re.sub(r"\s+", " ", raw_answer)
+        if kind == "fallback":
+            return {"answer": clean_answer}
+
+        print("clean_answer", clean_answer)
+
+        # Validate response - check if model says no enough data
+        insufficient_data_phrases = [
+            "không có đủ dữ liệu",
+            "không đủ thông tin",
+            "không tìm thấy thông tin",
+            "dữ liệu không đủ",
+        ]
+
+        if any(phrase in clean_answer.lower() for phrase in insufficient_data_phrases):
+            return {"answer": INSUFFICIENT_DATA_ANSWER}
+
+        return {"answer": clean_answer}
 
     def ask_by_faiss(
-        self, faiss: FAISS, question: str, similarity_threshold: float = None
+        self,
+        faiss: FAISS,
+        question: str,
+        similarity_threshold: float = None,
+        question_vector: list[float] | None = None,
     ) -> dict:
         try:
-            # Use provided threshold or default
-            # threshold = (
-            #     similarity_threshold
-            #     if similarity_threshold is not None
-            #     else self.similarity_threshold
-            # )
-
-            question_vector = self.embedding.embed_query(question)
-
-            # Get similarity search results with scores
-            results = faiss.similarity_search_by_vector(question_vector, k=20)
-            print("results", results)
-
-            if results:
-                # Filter by similarity threshold (lower = higher similarity)
-                # filtered_results = [
-                #     (result, score) for result, score in results if score < threshold
-                # ]
-                filtered_results = results
-
-                # Sort by similarity score (ascending, so most similar first)
-                # filtered_results = sorted(filtered_results, key=lambda x: x[1])
-
-                if filtered_results:
-                    top_contexts = [
-                        result.page_content.strip() for result in filtered_results
-                    ]
-                    context = "\n".join(top_contexts)
-                    print(f"Found {len(filtered_results)} relevant contexts")
-
-                    disaster_expert_prompt = (
-                        "Bạn là một chuyên gia tư vấn thông tin thiên tai và "
-                        "khẩn cấp của Việt Nam. Nhiệm vụ của bạn là cung cấp "
-                        "thông tin chính xác, kịp thời về thiên tai, "
-                        "cảnh báo khí tượng, và hướng dẫn ứng phó khẩn cấp.\n\n"
-                        "NGUYÊN TẮC HOẠT ĐỘNG:\n"
-                        "1. Chỉ trả lời các câu hỏi liên quan đến thiên tai, "
-                        "khí tượng, cảnh báo tự nhiên, và ứng phó khẩn cấp\n"
-                        "2. Sử dụng CHÍNH XÁC thông tin từ dữ liệu được cung cấp\n"
-                        "3. Nếu dữ liệu không đủ để trả lời câu hỏi, nói rõ "
-                        "'Tôi không có đủ dữ liệu để trả lời câu hỏi này'\n"
-                        "4. Trả lời bằng tiếng Việt, rõ ràng và dễ hiểu\n"
-                        "5. Ưu tiên thông tin an toàn và cảnh báo kịp thời\n"
-                        "6. ĐẶC BIỆT: Nếu có câu hỏi về 'nơi trú ẩn', 'chỗ ẩn náu', "
-                        "'tôi nên trốn ở đâu', 'nên đi đâu để an toàn' hoặc tương tự, "
-                        "hãy trả lời: 'Vui lòng liên hệ với cán bộ, lực lượng "
-                        "chức năng gần nhất để được hướng dẫn về địa điểm trú ẩn "
-                        "an toàn phù hợp với tình hình thực tế tại khu vực của bạn.'\n\n"
-                        f"DỮ LIỆU THAM KHẢO:\n{context}\n\n"
-                        f"CÂU HỎI: {question}\n\n"
-                        "Hãy phân tích dữ liệu tham khảo và trả lời câu hỏi. "
-                        "Nếu dữ liệu không chứa thông tin cần thiết để trả lời "
-                        "chính xác câu hỏi, hãy trả lời: 'Tôi không có đủ dữ liệu "
-                        "để trả lời câu hỏi này.'\n\nTRẢ LỜI:"
-                    )
-
-                    response = self.chat_bot(messages=disaster_expert_prompt).content
-                    raw_answer = response
-                    clean_answer = re.sub(r"\s+", " ", raw_answer)
-                    print("clean_answer", clean_answer)
-
-                    # Validate response - check if model says no enough data
-                    insufficient_data_phrases = [
-                        "không có đủ dữ liệu",
-                        "không đủ thông tin",
-                        "không tìm thấy thông tin",
-                        "dữ liệu không đủ",
-                    ]
+            if question_vector is None:
+                question_vector = self.embed_question(question)
+
+            kind, prompt = self.prepare_faiss_prompt(faiss, question, question_vector)
+            raw_answer = None
+            if prompt is not None:
+                raw_answer = self.complete(prompt)
+            return self.finalize_answer(kind, raw_answer)
+        except Exception as e:
+            print('error ask by faiss', str(e))
+            raise e
 
-                    if any(
-                        phrase in clean_answer.lower()
-                        for phrase in insufficient_data_phrases
-                    ):
-                        return {"answer": "Tôi không có đủ dữ liệu để trả lời câu hỏi này."}
-
-                    return {"answer": clean_answer}
-                else:
-                    print("No relevant contexts found based on threshold")
-                    return {"answer": "Tôi không có đủ dữ liệu để trả lời câu hỏi này."}
-
-            # Fallback: if no FAISS results, ask general question with context
-            fallback_prompt = (
-                "Bạn là một chuyên gia tư vấn thông tin thiên tai và "
-                "khẩn cấp của Việt Nam.\n\n"
-                f"CÂU HỎI: {question}\n\n"
-                "Nếu câu hỏi KHÔNG liên quan đến thiên tai, khí tượng, "
-                "cảnh báo tự nhiên, hoặc ứng phó khẩn cấp, hãy trả lời: "
-                "'Tôi chỉ có thể tư vấn về các vấn đề liên quan đến thiên tai "
-                "và ứng phó khẩn cấp.'\n\n"
-                "ĐẶC BIỆT: Nếu có câu hỏi về 'nơi trú ẩn', 'chỗ ẩn náu', "
-                "'tôi nên trốn ở đâu', 'nên đi đâu để an toàn' hoặc tương tự, "
-                "hãy trả lời: 'Vui lòng liên hệ với cán bộ, lực lượng "
-                "chức năng gần nhất để được hướng dẫn về địa điểm trú ẩn "
-                "an toàn phù hợp với tình hình thực tế tại khu vực của bạn.'\n\n"
-                "Nếu câu hỏi có liên quan nhưng bạn không có thông tin cụ thể, "
-                "hãy trả lời: 'Tôi không có đủ dữ liệu để trả lời câu hỏi này.'"
-                "\n\nTRẢ LỜI:"
-            )
+    async def aask_by_faiss(
+        self,
+        faiss: FAISS,
+        question: str,
+        similarity_threshold: float = None,
+        question_vector: list[float] | None = None,
+    ) -> dict:
+        try:
+            if question_vector is None:
+                question_vector = await self.aembed_question(question)
 
-            response = self.chat_bot(messages=fallback_prompt).content
-            raw_answer = response
-            clean_answer = re.sub(r"\s+", " ", raw_answer)
-            return {"answer": clean_answer}
+            # FAISS search and token counting are CPU-bound
+            kind, prompt = await run_blocking(
+                self.prepare_faiss_prompt, faiss, question, question_vector
+            )
+            raw_answer = None
+            if prompt is not None:
+                raw_answer = await self.acomplete(prompt)
+            return self.finalize_answer(kind, raw_answer)
         except Exception as e:
             print('error ask by faiss', str(e))
             raise e
@@ -230,32 +483,132 @@ class OpenAIModel:
     def ask_by_chatbot_id(
         self, chatbot_id: str, question: str, similarity_threshold: float = None
     ) -> dict:
+        canned = self.intent_classifier.match_rules(question)
+        if canned is not None:
+            return canned
+
+        question_vector = self.embed_question(question)
+        canned = self.intent_classifier.match_examples(question_vector)
+        if canned is not None:
+            return canned
+
+        if not settings.ANSWER_CACHE_ENABLED:
+            faiss = self.load_vector_db(chatbot_id)
+            return self.ask_by_faiss(
+                faiss, question, similarity_threshold, question_vector=question_vector
+            )
+
+        directory = "data/vector_dbs"
+        version = VectorDBCache.index_version(
+            f"{directory}/{chatbot_id}_faiss.index"
+        )
+        cached = self.answer_cache.get(chatbot_id, version, question_vector)
+        if cached is not None:
+            return cached
+
         faiss = self.load_vector_db(chatbot_id)
-        return self.ask_by_faiss(faiss, question, similarity_threshold)
-
-    def ask_without_faiss(self, question: str) -> dict:
-        # Apply disaster context even without FAISS
-        disaster_prompt = (
-            "Bạn là một chuyên gia tư vấn thông tin thiên tai và "
-            "khẩn cấp của Việt Nam.\n\n"
-            f"CÂU HỎI: {question}\n\n"
-            "Nếu câu hỏi KHÔNG liên quan đến thiên tai, khí tượng, "
-            "cảnh báo tự nhiên, hoặc ứng phó khẩn cấp, hãy trả lời: "
-            "'Tôi chỉ có thể tư vấn về các vấn đề liên quan đến thiên tai "
-            "và ứng phó khẩn cấp.'\n\n"
-            "ĐẶC BIỆT: Nếu có câu hỏi về 'nơi trú ẩn', 'chỗ ẩn náu', "
-            "'tôi nên trốn ở đâu', 'nên đi đâu để an toàn' hoặc tương tự, "
-            "hãy trả lời: 'Vui lòng liên hệ với cán bộ, lực lượng "
-            "chức năng gần nhất để được hướng dẫn về địa điểm trú ẩn "
-            "an toàn phù hợp với tình hình thực tế tại khu vực của bạn.'\n\n"
-            "Nếu câu hỏi có liên quan nhưng bạn không có thông tin cụ thể "
-            "từ cơ sở dữ liệu, hãy trả lời: 'Tôi không có đủ dữ liệu để "
-            "trả lời câu hỏi này.'\n\nTRẢ LỜI:"
+        response = self.ask_by_faiss(
+            faiss, question, similarity_threshold, question_vector=question_vector
+        )
+        self.answer_cache.put(chatbot_id, version, question_vector, response)
+        return response
+
+    async def _amatch_examples(self, question_vector: list[float]) -> dict | None:
+        if self.intent_classifier.needs_fit:
+            await run_blocking(self.intent_classifier.fit)
+        return self.intent_classifier.match_examples(question_vector)
+
+    async def aask_by_chatbot_id(
+        self, chatbot_id: str, question: str, similarity_threshold: float = None
+    ) -> dict:
+        canned = self.intent_classifier.match_rules(question)
+        if canned is not None:
+            return canned
+
+        question_vector = await self.aembed_question(question)
+        canned = await self._amatch_examples(question_vector)
+        if canned is not None:
+            return canned
+
+        if not settings.ANSWER_CACHE_ENABLED:
+            faiss = await run_blocking(self.load_vector_db, chatbot_id)
+            return await self.aask_by_faiss(
+                faiss, question, similarity_threshold, question_vector=question_vector
+            )
+
+        directory = "data/vector_dbs"
+        version = VectorDBCache.index_version(
+            f"{directory}/{chatbot_id}_faiss.index"
         )
+        cached = self.answer_cache.get(chatbot_id, version, question_vector)
+        if cached is not None:
+            return cached
 
-        messages = [{"role": "user", "content": disaster_prompt}]
-        response = self.chat_bot(messages=messages)
-        return {"answer": response.content}
+        faiss = await run_blocking(self.load_vector_db, chatbot_id)
+        response = await self.aask_by_faiss(
+            faiss, question, similarity_threshold, question_vector=question_vector
+        )
+        self.answer_cache.put(chatbot_id, version, question_vector, response)
+        return response
+
+    async def astream_by_chatbot_id(
+        self, chatbot_id: str, question: str
+    ) -> AsyncIterator[tuple[str, dict]]:
+        """
+        Stream an answer as ("token", ...) events followed by one ("done", ...).
+
+        Tokens are forwarded raw as they arrive; the done event carries the
+        post-processed answer, which clients should display in their place.
+        """
+        canned = self.intent_classifier.match_rules(question)
+        if canned is not None:
+            yield "done", canned
+            return
+
+        directory = "data/vector_dbs"
+        version = VectorDBCache.index_version(
+            f"{directory}/{chatbot_id}_faiss.index"
+        )
+        question_vector = await self.aembed_question(question)
+        canned = await self._amatch_examples(question_vector)
+        if canned is not None:
+            yield "done", canned
+            return
+
+        if settings.ANSWER_CACHE_ENABLED:
+            cached = self.answer_cache.get(chatbot_id, version, question_vector)
+            if cached is not None:
+                yield "done", cached
+                return
+
+        faiss = await run_blocking(self.load_vector_db, chatbot_id)
+        kind, prompt = await run_blocking(
+            self.prepare_faiss_prompt, faiss, question, question_vector
+        )
+        raw_answer = None
+        if prompt is not None:
+            tokens = []
+            async for token in self.astream_completion(prompt):
+                tokens.append(token)
+                yield "token", {"content": token}
+            raw_answer = "".join(tokens)
+
+        response = self.finalize_answer(kind, raw_answer)
+        if settings.ANSWER_CACHE_ENABLED:
+            self.answer_cache.put(chatbot_id, version, question_vector, response)
+        yield "done", response
+
+    def ask_without_faiss(
+        self, question: str, priority: Priority = Priority.CHAT
+    ) -> dict:
+        answer = self.complete(general_messages(question), priority)
+        return {"answer": answer}
+
+    async def aask_without_faiss(
+        self, question: str, priority: Priority = Priority.CHAT
+    ) -> dict:
+        answer = await self.acomplete(general_messages(question), priority)
+        return {"answer": answer}
 
 
 openai_model = OpenAIModel()
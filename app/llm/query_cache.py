@@ -0,0 +1,66 @@
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable
+
+
+def normalize_question(question: str) -> str:
+    """NFC-normalize, casefold and collapse whitespace in a question."""
+    return " ".join(unicodedata.normalize("NFC", question).casefold().split())
+
+
+class QueryEmbeddingCache:
+    """
+    TTL/LRU cache of question vectors keyed by the normalized question text.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, list[float]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, question: str) -> list[float] | None:
+        key = normalize_question(question)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, question: str, vector: list[float]) -> None:
+        key = normalize_question(question)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get_or_embed(
+        self, question: str, embed: Callable[[str], list[float]]
+    ) -> list[float]:
+        vector = self.get(question)
+        if vector is None:
+            vector = embed(question)
+            self.put(question, vector)
+        return vector
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
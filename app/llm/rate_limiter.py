@@ -0,0 +1,231 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from enum import IntEnum
+
+from app.core.config import settings
+
+
+class Priority(IntEnum):
+    WARNING = 0
+    EOP = 1
+    TASK = 2
+    CHAT = 3
+
+
+# Share of each bucket a priority class must leave untouched, so lower
+# classes back off first when a model is close to its limits
+PRIORITY_RESERVES = {
+    Priority.WARNING: 0.0,
+    Priority.EOP: 0.1,
+    Priority.TASK: 0.2,
+    Priority.CHAT: 0.3,
+}
+
+
+class RateLimitExceeded(Exception):
+    pass
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter for upstream LLM and embedding calls.
+
+    Each model has a requests-per-minute and a tokens-per-minute bucket. The
+    bucket levels live in SQLite, so all uvicorn workers on the host draw from
+    the same budget. Callers wait (up to max_wait_seconds) until both buckets
+    can cover the call while keeping their priority's reserve; when more than
+    max_waiters calls are already waiting in this worker, non-warning calls
+    are rejected immediately.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        limits: dict[str, dict[str, int]],
+        max_waiters: int,
+        max_wait_seconds: float,
+    ):
+        self.path = path
+        self.limits = limits
+        self.max_waiters = max_waiters
+        self.max_wait_seconds = max_wait_seconds
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._unlimited_models: set[str] = set()
+        self._waiters = 0
+        self._waiters_lock = threading.Lock()
+        self.acquired = 0
+        self.waited = 0
+        self.rejected = 0
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "model TEXT NOT NULL, "
+                "kind TEXT NOT NULL, "
+                "level REAL NOT NULL, "
+                "updated REAL NOT NULL, "
+                "PRIMARY KEY (model, kind))"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _try_acquire(self, model: str, tokens: int, priority: Priority) -> float:
+        """Take from both buckets if possible; otherwise return seconds to wait."""
+        limits = self.limits.get(model)
+        if not limits:
+            if model not in self._unlimited_models:
+                self._unlimited_models.add(model)
+                print(f"No rate limits configured for {model}, not limiting it")
+            return 0.0
+
+        needs = {"requests": 1, "tokens": tokens}
+        conn = self._connection()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            levels = {}
+            wait = 0.0
+            for kind, need in needs.items():
+                capacity = limits["rpm" if kind == "requests" else "tpm"]
+                rate = capacity / 60.0
+                row = conn.execute(
+                    "SELECT level, updated FROM buckets WHERE model = ? AND kind = ?",
+                    (model, kind),
+                ).fetchone()
+                level = capacity if row is None else row[0]
+                if row is not None:
+                    level = min(capacity, level + (now - row[1]) * rate)
+                levels[kind] = level
+                floor = capacity * PRIORITY_RESERVES[priority]
+                # A single call larger than the share this priority may use
+                # can only wait for a full bucket and then take that share
+                need = min(need, capacity - floor)
+                if level - need < floor:
+                    wait = max(wait, (need + floor - level) / rate)
+                needs[kind] = need
+
+            if wait == 0.0:
+                for kind in levels:
+                    levels[kind] -= needs[kind]
+            conn.executemany(
+                "INSERT OR REPLACE INTO buckets (model, kind, level, updated) "
+                "VALUES (?, ?, ?, ?)",
+                [(model, kind, level, now) for kind, level in levels.items()],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def _enter_queue(self, priority: Priority) -> None:
+        with self._waiters_lock:
+            if priority != Priority.WARNING and self._waiters >= self.max_waiters:
+                self.rejected += 1
+                raise RateLimitExceeded("Too many requests are waiting for the LLM")
+            self._waiters += 1
+            self.waited += 1
+
+    def _leave_queue(self) -> None:
+        with self._waiters_lock:
+            self._waiters -= 1
+
+    def try_acquire(self, model: str, tokens: int, priority: Priority) -> bool:
+        """Take budget only if it is available now; never waits or queues."""
+        if self._try_acquire(model, tokens, priority) == 0.0:
+            self.acquired += 1
+            return True
+        return False
+
+    async def atry_acquire(self, model: str, tokens: int, priority: Priority) -> bool:
+        return await asyncio.to_thread(self.try_acquire, model, tokens, priority)
+
+    def acquire(self, model: str, tokens: int, priority: Priority) -> None:
+        wait = self._try_acquire(model, tokens, priority)
+        if wait == 0.0:
+            self.acquired += 1
+            return
+
+        self._enter_queue(priority)
+        try:
+            deadline = time.monotonic() + self.max_wait_seconds
+            while wait > 0.0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.rejected += 1
+                    raise RateLimitExceeded(f"Rate limit wait exceeded for {model}")
+                time.sleep(min(wait, remaining, 1.0))
+                wait = self._try_acquire(model, tokens, priority)
+            self.acquired += 1
+        finally:
+            self._leave_queue()
+
+    async def aacquire(self, model: str, tokens: int, priority: Priority) -> None:
+        wait = await asyncio.to_thread(self._try_acquire, model, tokens, priority)
+        if wait == 0.0:
+            self.acquired += 1
+            return
+
+        self._enter_queue(priority)
+        try:
+            deadline = time.monotonic() + self.max_wait_seconds
+            while wait > 0.0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.rejected += 1
+                    raise RateLimitExceeded(f"Rate limit wait exceeded for {model}")
+                await asyncio.sleep(min(wait, remaining, 1.0))
+                wait = await asyncio.to_thread(
+                    self._try_acquire, model, tokens, priority
+                )
+            self.acquired += 1
+        finally:
+            self._leave_queue()
+
+    def stats(self) -> dict:
+        with self._waiters_lock:
+            return {
+                "waiting": self._waiters,
+                "acquired": self.acquired,
+                "waited": self.waited,
+                "rejected": self.rejected,
+            }
+
+
+class _DisabledRateLimiter:
+    def try_acquire(self, model: str, tokens: int, priority: Priority) -> bool:
+        return True
+
+    async def atry_acquire(self, model: str, tokens: int, priority: Priority) -> bool:
+        return True
+
+    def acquire(self, model: str, tokens: int, priority: Priority) -> None:
+        return None
+
+    async def aacquire(self, model: str, tokens: int, priority: Priority) -> None:
+        return None
+
+    def stats(self) -> dict:
+        return {"enabled": False}
+
+
+if settings.RATE_LIMIT_ENABLED:
+    rate_limiter = RateLimiter(
+        path=settings.RATE_LIMIT_DB_PATH,
+        limits=settings.RATE_LIMITS,
+        max_waiters=settings.RATE_LIMIT_MAX_WAITERS,
+        max_wait_seconds=settings.RATE_LIMIT_MAX_WAIT_SECONDS,
+    )
+else:
+    rate_limiter = _DisabledRateLimiter()
@@ -0,0 +1,269 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, TypeVar
+
+import httpx
+import openai
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable
+from tenacity import (
+    AsyncRetrying,
+    Retrying,
+    retry_if_exception,
+    stop_after_attempt,
+    stop_after_delay,
+    wait_random_exponential,
+)
+
+from app.core.config import settings
+from app.llm.rate_limiter import Priority, rate_limiter
+from app.llm.usage import prompt_cache_stats
+
+T = TypeVar("T")
+
+RETRYABLE_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+    httpx.TransportError,
+    asyncio.TimeoutError,
+)
+
+
+def is_retryable(error: BaseException) -> bool:
+    return isinstance(error, RETRYABLE_ERRORS)
+
+
+class ResiliencePolicy:
+    """
+    Deadline, per-attempt timeout, jittered retries and optional hedging for
+    one kind of upstream LLM call.
+
+    With hedging enabled, a duplicate request is fired once the current
+    attempt has been running longer than the observed p95 latency, and
+    whichever answers first wins. Hedging only kicks in after min_samples
+    successful calls have been observed.
+
+    invoke / ainvoke wrap a chat runnable with the rate limiter: budget for
+    one request is reserved once, before the timed and retried section, so
+    waiting for it does not eat into the timeout and retries are not charged
+    again. A hedge is a second upstream request, so it is only fired when
+    the limiter can cover it right away, and is skipped otherwise.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        timeout: float,
+        deadline: float,
+        max_attempts: int,
+        backoff_initial: float,
+        backoff_max: float,
+        hedge: bool,
+        hedge_min_samples: int,
+    ):
+        self.name = name
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_min_samples = hedge_min_samples
+        self._latencies: deque[float] = deque(maxlen=500)
+        self.calls = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedges_skipped = 0
+        self.hedge_wins = 0
+
+    @classmethod
+    def for_chat(cls, name: str) -> "ResiliencePolicy":
+        return cls(
+            name,
+            timeout=settings.LLM_CHAT_TIMEOUT_SECONDS,
+            deadline=settings.LLM_CHAT_DEADLINE_SECONDS,
+            max_attempts=settings.LLM_MAX_ATTEMPTS,
+            backoff_initial=settings.LLM_BACKOFF_INITIAL_SECONDS,
+            backoff_max=settings.LLM_BACKOFF_MAX_SECONDS,
+            hedge=settings.LLM_HEDGE_ENABLED,
+            hedge_min_samples=settings.LLM_HEDGE_MIN_SAMPLES,
+        )
+
+    @classmethod
+    def for_long_form(cls, name: str) -> "ResiliencePolicy":
+        """Policy for long generations (EOPs, task lists)."""
+        return cls(
+            name,
+            timeout=settings.LLM_LONG_TIMEOUT_SECONDS,
+            deadline=settings.LLM_LONG_DEADLINE_SECONDS,
+            max_attempts=settings.LLM_MAX_ATTEMPTS,
+            backoff_initial=settings.LLM_BACKOFF_INITIAL_SECONDS,
+            backoff_max=settings.LLM_BACKOFF_MAX_SECONDS,
+            hedge=settings.LLM_HEDGE_ENABLED,
+            hedge_min_samples=settings.LLM_HEDGE_MIN_SAMPLES,
+        )
+
+    def hedge_delay(self) -> float | None:
+        if not self.hedge or len(self._latencies) < self.hedge_min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def _record(self, started: float) -> None:
+        self._latencies.append(time.monotonic() - started)
+
+    def _before_retry(self, retry_state) -> None:
+        self.retries += 1
+        print(
+            f"Retrying {self.name} LLM call after error:",
+            retry_state.outcome.exception(),
+        )
+
+    def _retry_kwargs(self) -> dict:
+        backoff = wait_random_exponential(
+            multiplier=self.backoff_initial, max=self.backoff_max
+        )
+
+        def wait(retry_state) -> float:
+            # Never sleep past the deadline
+            remaining = self.deadline - retry_state.seconds_since_start
+            return max(0.0, min(backoff(retry_state), remaining))
+
+        return {
+            "stop": stop_after_attempt(self.max_attempts)
+            | stop_after_delay(self.deadline),
+            "wait": wait,
+            "retry": retry_if_exception(is_retryable),
+            "before_sleep": self._before_retry,
+            "reraise": True,
+        }
+
+    async def _hedged(
+        self,
+        func: Callable[[], Awaitable[T]],
+        reserve_hedge: Callable[[], Awaitable[bool]] | None = None,
+    ) -> T:
+        started = time.monotonic()
+        delay = self.hedge_delay()
+        primary = asyncio.ensure_future(func())
+        if delay is None:
+            result = await primary
+            self._record(started)
+            return result
+
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                if reserve_hedge is None or await reserve_hedge():
+                    self.hedges += 1
+                    pending.add(asyncio.ensure_future(func()))
+                else:
+                    self.hedges_skipped += 1
+
+            error = None
+            while done or pending:
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedge_wins += 1
+                        self._record(started)
+                        return task.result()
+                    error = task.exception()
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def acall(
+        self,
+        func: Callable[[], Awaitable[T]],
+        reserve_hedge: Callable[[], Awaitable[bool]] | None = None,
+    ) -> T:
+        """
+        Run an async call under this policy; func must start a fresh request.
+
+        Each attempt gets the per-attempt timeout or whatever is left of the
+        deadline, whichever is shorter, so the deadline is never overshot.
+        reserve_hedge, if given, is awaited before firing a hedge, which is
+        skipped when it returns False.
+        """
+        self.calls += 1
+        started = time.monotonic()
+        async for attempt in AsyncRetrying(**self._retry_kwargs()):
+            with attempt:
+                remaining = self.deadline - (time.monotonic() - started)
+                if remaining <= 0:
+                    raise asyncio.TimeoutError(
+                        f"{self.name} LLM call exceeded its {self.deadline}s deadline"
+                    )
+                return await asyncio.wait_for(
+                    self._hedged(func, reserve_hedge), min(self.timeout, remaining)
+                )
+
+    def call(self, func: Callable[[], T]) -> T:
+        """
+        Run a sync call under this policy. The per-attempt timeout must be
+        enforced by the client itself, so a slow last attempt can still run
+        past the deadline; hedging is async-only.
+        """
+        self.calls += 1
+        for attempt in Retrying(**self._retry_kwargs()):
+            with attempt:
+                started = time.monotonic()
+                result = func()
+                self._record(started)
+                return result
+
+    def invoke(
+        self,
+        runnable: Runnable,
+        inputs: Any,
+        model_name: str,
+        tokens: int,
+        priority: Priority,
+    ) -> BaseMessage:
+        """Reserve budget, then invoke runnable under this policy."""
+        rate_limiter.acquire(model_name, tokens, priority)
+        message = self.call(lambda: runnable.invoke(inputs))
+        prompt_cache_stats.record(model_name, message)
+        return message
+
+    async def ainvoke(
+        self,
+        runnable: Runnable,
+        inputs: Any,
+        model_name: str,
+        tokens: int,
+        priority: Priority,
+    ) -> BaseMessage:
+        """Reserve budget, then invoke runnable under this policy."""
+        await rate_limiter.aacquire(model_name, tokens, priority)
+
+        async def attempt():
+            return await runnable.ainvoke(inputs)
+
+        async def reserve_hedge() -> bool:
+            return await rate_limiter.atry_acquire(model_name, tokens, priority)
+
+        message = await self.acall(attempt, reserve_hedge)
+        prompt_cache_stats.record(model_name, message)
+        return message
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "hedges_skipped": self.hedges_skipped,
+            "hedge_wins": self.hedge_wins,
+            "hedge_delay": self.hedge_delay(),
+        }
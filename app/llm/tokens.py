@@ -0,0 +1,60 @@
+from functools import cache
+
+import tiktoken
+
+# Used when no tokenizer is available. UTF-8 bytes over-count Vietnamese
+# text a little, which keeps budgets and rate-limit reservations on the safe side
+BYTES_PER_TOKEN = 3
+
+
+@cache
+def get_encoding(model_name: str) -> tiktoken.Encoding | None:
+    """
+    Tokenizer for model_name, or None if it cannot be loaded.
+
+    tiktoken downloads its BPE files on first use, so an offline host without
+    a warm tiktoken cache gets None and token counts are estimated instead.
+    """
+    try:
+        try:
+            return tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"Tokenizer for {model_name} unavailable, estimating token counts:", e)
+        return None
+
+
+def count_tokens(text: str, model_name: str) -> int:
+    encoding = get_encoding(model_name)
+    if encoding is None:
+        return -(-len(text.encode("utf-8")) // BYTES_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_tokens(text: str, max_tokens: int, model_name: str) -> str:
+    """Cut text to at most max_tokens tokens."""
+    if max_tokens <= 0:
+        return ""
+    encoding = get_encoding(model_name)
+    if encoding is None:
+        data = text.encode("utf-8")[: max_tokens * BYTES_PER_TOKEN]
+        return data.decode("utf-8", errors="ignore")
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    # Dropping a partial multi-byte character can only shorten the text
+    return encoding.decode(tokens[:max_tokens]).rstrip("\ufffd")
+
+
+def count_prompt_tokens(prompt, model_name: str) -> int:
+    """Count tokens of a prompt given as a string or a list of messages."""
+    if isinstance(prompt, str):
+        return count_tokens(prompt, model_name)
+    return sum(
+        count_tokens(
+            message["content"] if isinstance(message, dict) else message.content,
+            model_name,
+        )
+        for message in prompt
+    )
@@ -0,0 +1,61 @@
+import threading
+
+from langchain_core.messages import BaseMessage
+
+
+class PromptCacheStats:
+    """
+    Per-model prompt token counts, including the tokens the provider served
+    from its prompt-prefix cache.
+    """
+
+    def __init__(self):
+        self._models: dict[str, dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _usage(message: BaseMessage) -> tuple[int, int] | None:
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            details = usage.get("input_token_details") or {}
+            return usage.get("input_tokens", 0), details.get("cache_read", 0) or 0
+
+        token_usage = (getattr(message, "response_metadata", None) or {}).get(
+            "token_usage"
+        )
+        if token_usage:
+            details = token_usage.get("prompt_tokens_details") or {}
+            return (
+                token_usage.get("prompt_tokens", 0),
+                details.get("cached_tokens", 0) or 0,
+            )
+        return None
+
+    def record(self, model_name: str, message: BaseMessage) -> None:
+        usage = self._usage(message)
+        if usage is None:
+            return
+        with self._lock:
+            stats = self._models.setdefault(
+                model_name, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0}
+            )
+            stats["calls"] += 1
+            stats["prompt_tokens"] += usage[0]
+            stats["cached_tokens"] += usage[1]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                model_name: {
+                    **stats,
+                    "cache_hit_rate": (
+                        stats["cached_tokens"] / stats["prompt_tokens"]
+                        if stats["prompt_tokens"]
+                        else 0.0
+                    ),
+                }
+                for model_name, stats in self._models.items()
+            }
+
+
+prompt_cache_stats = PromptCacheStats()
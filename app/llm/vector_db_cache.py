@@ -0,0 +1,115 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+
+
+class VectorDBCache:
+    """
+    Bounded LRU of loaded vector stores, keyed by chatbot_id.
+
+    Each entry remembers the on-disk version (mtime and size of the index
+    files) it was loaded from, so a rebuilt index is reloaded on the next
+    lookup instead of being served stale. Entries are evicted in LRU order
+    when either the entry count or the approximate memory budget is exceeded.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[tuple[int, int], int, Any]] = (
+            OrderedDict()
+        )
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def index_version(path: str) -> tuple[int, int]:
+        """Return (latest mtime in ns, total size in bytes) of an index folder."""
+        if os.path.isfile(path):
+            stat = os.stat(path)
+            return stat.st_mtime_ns, stat.st_size
+
+        latest_mtime = 0
+        total_size = 0
+        for entry in os.scandir(path):
+            # Skip files still being written by save_faiss_store
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                latest_mtime = max(latest_mtime, stat.st_mtime_ns)
+                total_size += stat.st_size
+        return latest_mtime, total_size
+
+    def get_or_load(
+        self,
+        chatbot_id: str,
+        path: str,
+        loader: Callable[[], Any],
+        size_of: Callable[[Any], int] | None = None,
+    ):
+        """
+        Return the cached value for chatbot_id, loading it on a miss.
+
+        size_of returns the memory charged against the budget for a loaded
+        value; by default that is the on-disk size of the index.
+        """
+        version = self.index_version(path)
+
+        with self._lock:
+            entry = self._entries.get(chatbot_id)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(chatbot_id)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+
+        value = loader()
+        size = size_of(value) if size_of is not None else version[1]
+
+        with self._lock:
+            self._remove(chatbot_id)
+            if size <= self.max_bytes:
+                self._entries[chatbot_id] = (version, size, value)
+                self._total_bytes += size
+                self._evict()
+        return value
+
+    def invalidate(self, chatbot_id: str) -> None:
+        with self._lock:
+            self._remove(chatbot_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _remove(self, chatbot_id: str) -> None:
+        entry = self._entries.pop(chatbot_id, None)
+        if entry is not None:
+            self._total_bytes -= entry[1]
+
+    def _evict(self) -> None:
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or self._total_bytes > self.max_bytes
+        ):
+            _, (_, size, _) = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
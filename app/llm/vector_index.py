@@ -0,0 +1,331 @@
+import math
+import os
+import pickle
+import shutil
+import time
+from dataclasses import dataclass
+
+import faiss
+import numpy as np
+from langchain.vectorstores.faiss import FAISS
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_core.embeddings import Embeddings
+
+from app.core.config import settings
+
+
+@dataclass
+class IndexSpec:
+    """
+    Describes which FAISS index to build and how to search it.
+
+    kind is one of "flat", "hnsw", "ivf_flat", "ivf_pq" or "auto", which
+    picks a type from the corpus size.
+    """
+
+    kind: str = "auto"
+    hnsw_m: int = 32
+    hnsw_ef_construction: int = 80
+    hnsw_ef_search: int = 64
+    # 0 means derive from the corpus size
+    ivf_nlist: int = 0
+    ivf_nprobe: int = 16
+    pq_m: int = 16
+    pq_nbits: int = 8
+    train_sample_size: int = 50_000
+    auto_flat_max: int = 20_000
+    auto_ivf_flat_max: int = 200_000
+
+    @classmethod
+    def from_settings(cls) -> "IndexSpec":
+        return cls(
+            kind=settings.VECTOR_INDEX_TYPE,
+            hnsw_m=settings.VECTOR_INDEX_HNSW_M,
+            hnsw_ef_construction=settings.VECTOR_INDEX_HNSW_EF_CONSTRUCTION,
+            hnsw_ef_search=settings.VECTOR_INDEX_HNSW_EF_SEARCH,
+            ivf_nlist=settings.VECTOR_INDEX_IVF_NLIST,
+            ivf_nprobe=settings.VECTOR_INDEX_IVF_NPROBE,
+            pq_m=settings.VECTOR_INDEX_PQ_M,
+            train_sample_size=settings.VECTOR_INDEX_TRAIN_SAMPLE_SIZE,
+            auto_flat_max=settings.VECTOR_INDEX_AUTO_FLAT_MAX,
+            auto_ivf_flat_max=settings.VECTOR_INDEX_AUTO_IVF_FLAT_MAX,
+        )
+
+    def resolve_kind(self, n_vectors: int) -> str:
+        kind = self.kind
+        if kind == "auto":
+            if n_vectors <= self.auto_flat_max:
+                kind = "flat"
+            elif n_vectors <= self.auto_ivf_flat_max:
+                kind = "ivf_flat"
+            else:
+                kind = "ivf_pq"
+
+        # Too few vectors to train the quantizers: build a simpler index
+        train_size = min(n_vectors, self.train_sample_size)
+        if kind == "ivf_pq" and train_size < 2**self.pq_nbits:
+            print(
+                f"{train_size} training vectors are too few for ivf_pq "
+                f"(needs {2**self.pq_nbits}), building ivf_flat instead"
+            )
+            kind = "ivf_flat"
+        min_ivf_vectors = 39 * self.resolve_nlist(n_vectors)
+        if kind in ("ivf_flat", "ivf_pq") and n_vectors < min_ivf_vectors:
+            print(f"{n_vectors} vectors are too few for {kind}, building flat instead")
+            kind = "flat"
+        return kind
+
+    def resolve_nlist(self, n_vectors: int) -> int:
+        nlist = self.ivf_nlist or int(4 * math.sqrt(n_vectors))
+        # FAISS wants ~39 training points per centroid
+        return max(1, min(nlist, n_vectors // 39))
+
+
+def _pq_subquantizers(dimension: int, pq_m: int) -> int:
+    """Largest divisor of the dimension not above pq_m."""
+    for m in range(min(pq_m, dimension), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+
+def create_index(spec: IndexSpec, vectors: np.ndarray) -> faiss.Index:
+    """Create an empty (but trained, if needed) index for the vectors."""
+    n_vectors, dimension = vectors.shape
+    kind = spec.resolve_kind(n_vectors)
+
+    if kind == "flat":
+        return faiss.IndexFlatL2(dimension)
+
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, spec.hnsw_m)
+        index.hnsw.efConstruction = spec.hnsw_ef_construction
+        return index
+
+    nlist = spec.resolve_nlist(n_vectors)
+    quantizer = faiss.IndexFlatL2(dimension)
+    if kind == "ivf_flat":
+        index = faiss.IndexIVFFlat(quantizer, dimension, nlist)
+    elif kind == "ivf_pq":
+        index = faiss.IndexIVFPQ(
+            quantizer,
+            dimension,
+            nlist,
+            _pq_subquantizers(dimension, spec.pq_m),
+            spec.pq_nbits,
+        )
+    else:
+        raise ValueError(f"Unknown vector index type: {kind}")
+
+    sample = vectors
+    if n_vectors > spec.train_sample_size:
+        rng = np.random.default_rng(0)
+        sample = vectors[
+            rng.choice(n_vectors, spec.train_sample_size, replace=False)
+        ]
+    index.train(sample)
+    return index
+
+
+def tune_index(index: faiss.Index, spec: IndexSpec) -> None:
+    """Apply search-time parameters (nprobe / efSearch) to an index."""
+    parameter_space = faiss.ParameterSpace()
+    if faiss.try_extract_index_ivf(index) is not None:
+        parameter_space.set_index_parameter(index, "nprobe", spec.ivf_nprobe)
+    elif isinstance(index, faiss.IndexHNSW):
+        parameter_space.set_index_parameter(index, "efSearch", spec.hnsw_ef_search)
+
+
+def supports_removal(index: faiss.Index) -> bool:
+    """
+    Whether langchain's FAISS.delete is safe on this index.
+
+    It assumes remove_ids compacts the remaining ids, which only flat indexes
+    do: HNSW cannot remove at all and IVF keeps the original labels.
+    """
+    return isinstance(index, faiss.IndexFlat)
+
+
+def build_faiss_store(
+    texts: list[str],
+    embedding: Embeddings,
+    metadatas: list[dict] | None = None,
+    ids: list[str] | None = None,
+    spec: IndexSpec | None = None,
+) -> FAISS:
+    """Embed texts and build a langchain FAISS store with the given index spec."""
+    spec = spec or IndexSpec.from_settings()
+    vectors = embedding.embed_documents(texts)
+    index = create_index(spec, np.asarray(vectors, dtype=np.float32))
+    print(f"Building {type(index).__name__} over {len(texts)} chunks")
+
+    store = FAISS(
+        embedding_function=embedding,
+        index=index,
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+    )
+    store.add_embeddings(
+        list(zip(texts, vectors, strict=True)), metadatas=metadatas, ids=ids
+    )
+    tune_index(index, spec)
+    return store
+
+
+# File in a store folder naming the version directory that holds the index
+CURRENT_FILE = "CURRENT"
+# Versions kept on disk: the current one and the one a worker may have just
+# read from CURRENT before the last swap
+KEEP_VERSIONS = 2
+LOAD_ATTEMPTS = 3
+
+
+def current_version_dir(folder: str) -> str:
+    """
+    Directory holding the current index.faiss / index.pkl of a store.
+
+    Folders written by FAISS.save_local (or before versioning) have no
+    CURRENT file and keep the files at the top level.
+    """
+    try:
+        with open(os.path.join(folder, CURRENT_FILE), encoding="utf-8") as file:
+            return os.path.join(folder, file.read().strip())
+    except FileNotFoundError:
+        return folder
+
+
+def save_faiss_store(store: FAISS, folder: str) -> None:
+    """
+    Save a store into a new version directory and switch to it atomically.
+
+    index.faiss and index.pkl are written to folder/v<timestamp>, then the
+    CURRENT file is replaced to point at it, so a worker always loads an index
+    and docstore from the same save. Workers that have an older version
+    memory-mapped keep reading intact pages; versions beyond KEEP_VERSIONS
+    are removed.
+    """
+    version = f"v{time.time_ns()}"
+    version_dir = os.path.join(folder, version)
+    os.makedirs(version_dir)
+    faiss.write_index(store.index, os.path.join(version_dir, "index.faiss"))
+    with open(os.path.join(version_dir, "index.pkl"), "wb") as file:
+        pickle.dump((store.docstore, store.index_to_docstore_id), file)
+
+    current_path = os.path.join(folder, CURRENT_FILE)
+    tmp_path = f"{current_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        file.write(version)
+    os.replace(tmp_path, current_path)
+
+    # Files of the unversioned layout are superseded by CURRENT
+    for name in ("index.faiss", "index.pkl"):
+        try:
+            os.remove(os.path.join(folder, name))
+        except FileNotFoundError:
+            pass
+    versions = sorted(
+        entry.name
+        for entry in os.scandir(folder)
+        if entry.is_dir() and entry.name.startswith("v")
+    )
+    for name in versions[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(folder, name), ignore_errors=True)
+
+
+def _read_store(
+    directory: str, mmap: bool
+) -> tuple[faiss.Index, InMemoryDocstore, dict]:
+    index_path = os.path.join(directory, "index.faiss")
+    # faiss reports a missing file as a RuntimeError
+    if not os.path.exists(index_path):
+        raise FileNotFoundError(index_path)
+    index = None
+    if mmap:
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+        try:
+            index = faiss.read_index(index_path, flags)
+        except RuntimeError as e:
+            print("Cannot memory-map index, reading it instead", index_path, e)
+    if index is None:
+        index = faiss.read_index(index_path)
+
+    with open(os.path.join(directory, "index.pkl"), "rb") as file:
+        docstore, index_to_docstore_id = pickle.load(file)
+    return index, docstore, index_to_docstore_id
+
+
+def load_faiss_store(folder: str, embedding: Embeddings, mmap: bool = True) -> FAISS:
+    """
+    Load the current version of a store saved by save_faiss_store, or a
+    folder written by FAISS.save_local.
+
+    With mmap=True the index is opened read-only and memory-mapped: the codes
+    of flat indexes (including HNSW storage) and the inverted lists of IVF
+    indexes are served from the page cache, so all workers on the host share
+    one copy. Indexes that cannot be mapped are read normally.
+
+    A load that races with a save (its version was removed, or an
+    unversioned folder was half replaced so the index and docstore sizes
+    disagree) is retried.
+    """
+    for attempt in range(1, LOAD_ATTEMPTS + 1):
+        directory = current_version_dir(folder)
+        try:
+            index, docstore, index_to_docstore_id = _read_store(directory, mmap)
+        except FileNotFoundError:
+            if attempt == LOAD_ATTEMPTS:
+                raise
+            continue
+        if index.ntotal == len(index_to_docstore_id):
+            break
+        if attempt == LOAD_ATTEMPTS:
+            raise RuntimeError(
+                f"Index and docstore in {directory} have different sizes: "
+                f"{index.ntotal} != {len(index_to_docstore_id)}"
+            )
+        print("Index changed while loading, retrying", folder)
+        time.sleep(0.1)
+
+    return FAISS(
+        embedding_function=embedding,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=index_to_docstore_id,
+    )
+
+
+def mapped_bytes(index: faiss.Index) -> int:
+    """Approximate bytes of the index served from a memory map."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        # The graph is always read into memory, the vectors may be mapped
+        return mapped_bytes(index.storage)
+    if isinstance(index, faiss.IndexFlatCodes):
+        # IO_FLAG_MMAP_IFC leaves the codes as a non-owning view of the map
+        if getattr(index.codes, "is_owned", True):
+            return 0
+        return index.ntotal * index.code_size
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is None:
+        return 0
+    invlists = faiss.downcast_InvertedLists(ivf.invlists)
+    if not isinstance(invlists, faiss.OnDiskInvertedLists):
+        return 0
+    # Codes plus one int64 id per vector
+    return ivf.ntotal * (ivf.code_size + 8)
+
+
+def resident_bytes(folder: str, index: faiss.Index) -> int:
+    """
+    Approximate private memory of a store loaded from folder.
+
+    The docstore is always unpickled into memory. The index file counts
+    except for the part that is memory-mapped, which lives in the shared page
+    cache.
+    """
+    directory = current_version_dir(folder)
+    index_size = os.path.getsize(os.path.join(directory, "index.faiss"))
+    return os.path.getsize(os.path.join(directory, "index.pkl")) + max(
+        0, index_size - mapped_bytes(index)
+    )
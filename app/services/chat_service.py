@@ -1,11 +1,21 @@
 from typing import Optional
 import uuid
 
+from app.core.executor import run_blocking
 from app.llm.openai_model import openai_model
+from app.llm.rate_limiter import Priority, rate_limiter
+from app.llm.usage import prompt_cache_stats
 import requests
 from bs4 import BeautifulSoup
+from app.helper.http_cache import http_cache
 from app.helper.json import load_json
-from app.helper.crawl_nchmf import crawl_nchmf, crawl_all_news
+from app.helper.pdf import pdf_text_stats
+from app.helper.crawl_nchmf import (
+    acrawl_nchmf,
+    acrawl_news_documents,
+    crawl_nchmf,
+    crawl_news_documents,
+)
 from app.helper.crawl_vndms import get_vndms_warning_list
 from datetime import datetime
 
@@ -14,8 +24,7 @@ class ChatService:
     def __init__(self):
         self.openai_model = openai_model
 
-    def generate_warning(self) -> dict:
-        news_list = crawl_nchmf()
+    def _warning_prompt(self, news_list: list[dict]) -> str:
         context = ""
         for news in news_list:
             context += f"Title: {news['title']}\nLink: {news['link']}\nTime: {news['time']}\n\n"
@@ -32,55 +41,114 @@ class ChatService:
             {context}
             Respond strictly in JSON format. don't include any other information in the response like 'Here is the processed data as an array of JSON objects:'
         """
-        answer = self.openai_model.ask_without_faiss(prompt)["answer"]
+        return prompt
+
+    def generate_warning(self) -> dict:
+        news_list = crawl_nchmf()
+        answer = self.openai_model.ask_without_faiss(
+            self._warning_prompt(news_list), priority=Priority.WARNING
+        )["answer"]
         return {"data": load_json(answer)}
 
-    def create_chatbot(self) -> str:
+    async def agenerate_warning(self) -> dict:
+        news_list = await acrawl_nchmf()
+        answer = (
+            await self.openai_model.aask_without_faiss(
+                self._warning_prompt(news_list), priority=Priority.WARNING
+            )
+        )["answer"]
+        return {"data": load_json(answer)}
+
+    def create_chatbot(self, incremental: bool = False) -> str:
+        """
+        Build the chatbot index from the latest nchmf news and VNDMS warnings.
+
+        With incremental=True an existing index for the day is updated in
+        place: only added or changed documents are embedded and withdrawn
+        ones are removed.
+        """
         try:
-            #chatbot_id = datetime.now().strftime("%Y%m%d")
-            chatbot_id = "20250809"
+            chatbot_id = self._chatbot_id()
             print('chatbot_id', chatbot_id)
-            if openai_model.is_id_exist(chatbot_id):
+            if not incremental and openai_model.is_id_exist(chatbot_id):
                 raise Exception("Chatbot is already created")
-            texts = crawl_all_news()
-            vndms_data = get_vndms_warning_list()
-            WARNING_TYPE_MAPPING = {
-                "water_level": "Cảnh báo mực nước",
-                "warning_earthquake": "Cảnh báo động đất",
-                "warning_flood": "Cảnh báo lũ quét",
-                "warning_rain": "Cảnh báo lượng mưa",
-            }
-            for data in vndms_data:
-                if "popupInfo" in data:
-                    del data["popupInfo"]
-                if "source" in data:
-                    del data["source"]
-                if "stationCode" in data:
-                    del data["stationCode"]
-                data["Khu vực"] = data.get("label")
-                if "warning_level" in data:
-                    data["Mức độ cảnh báo"] = data.get("warning_level")
-                    del data["warning_level"]
-                if "warning_type" in data:
-                    data["Loại cảnh báo"] = WARNING_TYPE_MAPPING.get(
-                        data.get("warning_type"), data.get("warning_type")
-                    )
-
-            texts.extend(
-                [
-                    f"Dữ liệu cảnh báo thiên tai ngày {datetime.now().strftime('%d/%m/%Y')} theo định dạng json: "
-                    + str(data)
-                    for data in vndms_data
-                ]
-            )
-            print("texts", texts)
-            openai_model.build_vector_db_by_text(chatbot_id, texts)
+            documents = self._collect_documents()
+            return self._build_chatbot(chatbot_id, documents, incremental)
+        except Exception as e:
+            print('error', e)
+            raise e
 
-            return {"message": "Chatbot is created successfully"}
+    async def acreate_chatbot(self, incremental: bool = False) -> str:
+        try:
+            chatbot_id = self._chatbot_id()
+            print('chatbot_id', chatbot_id)
+            if not incremental and openai_model.is_id_exist(chatbot_id):
+                raise Exception("Chatbot is already created")
+            documents = await self._acollect_documents()
+            return await run_blocking(
+                self._build_chatbot, chatbot_id, documents, incremental
+            )
         except Exception as e:
             print('error', e)
             raise e
 
+    def _chatbot_id(self) -> str:
+        #return datetime.now().strftime("%Y%m%d")
+        return "20250809"
+
+    def _collect_documents(self) -> dict[str, str]:
+        documents = crawl_news_documents()
+        documents.update(self._vndms_documents())
+        print("documents", list(documents.keys()))
+        return documents
+
+    async def _acollect_documents(self) -> dict[str, str]:
+        documents = await acrawl_news_documents()
+        documents.update(await run_blocking(self._vndms_documents))
+        print("documents", list(documents.keys()))
+        return documents
+
+    def _build_chatbot(
+        self, chatbot_id: str, documents: dict[str, str], incremental: bool
+    ) -> dict:
+        if incremental:
+            summary = openai_model.update_vector_db(chatbot_id, documents)
+            return {"message": "Chatbot is updated successfully", **summary}
+
+        openai_model.build_vector_db_by_documents(chatbot_id, documents)
+
+        return {"message": "Chatbot is created successfully"}
+
+    def _vndms_documents(self) -> dict[str, str]:
+        vndms_data = get_vndms_warning_list()
+        WARNING_TYPE_MAPPING = {
+            "water_level": "Cảnh báo mực nước",
+            "warning_earthquake": "Cảnh báo động đất",
+            "warning_flood": "Cảnh báo lũ quét",
+            "warning_rain": "Cảnh báo lượng mưa",
+        }
+        for data in vndms_data:
+            if "popupInfo" in data:
+                del data["popupInfo"]
+            if "source" in data:
+                del data["source"]
+            if "stationCode" in data:
+                del data["stationCode"]
+            data["Khu vực"] = data.get("label")
+            if "warning_level" in data:
+                data["Mức độ cảnh báo"] = data.get("warning_level")
+                del data["warning_level"]
+            if "warning_type" in data:
+                data["Loại cảnh báo"] = WARNING_TYPE_MAPPING.get(
+                    data.get("warning_type"), data.get("warning_type")
+                )
+
+        return {
+            f"vndms:{data.get('label')}": f"Dữ liệu cảnh báo thiên tai ngày {datetime.now().strftime('%d/%m/%Y')} theo định dạng json: "
+            + str(data)
+            for data in vndms_data
+        }
+
     def ask_latest_chatbot(self, question: str) -> str:
         latest_chatbot_id = openai_model.latest_chatbot_id()
         print("latest_chatbot_id", latest_chatbot_id)
@@ -88,5 +156,36 @@ class ChatService:
         return response
 
     def ask_without_faiss(self, question: str) -> str:
+        canned = openai_model.intent_classifier.match_rules(question)
+        if canned is not None:
+            return canned
         response = openai_model.ask_without_faiss(question)
         return response
+
+    async def aask_latest_chatbot(self, question: str) -> str:
+        latest_chatbot_id = openai_model.latest_chatbot_id()
+        print("latest_chatbot_id", latest_chatbot_id)
+        return await openai_model.aask_by_chatbot_id(latest_chatbot_id, question)
+
+    async def aask_without_faiss(self, question: str) -> str:
+        canned = openai_model.intent_classifier.match_rules(question)
+        if canned is not None:
+            return canned
+        return await openai_model.aask_without_faiss(question)
+
+    async def astream_latest_chatbot(self, question: str):
+        latest_chatbot_id = openai_model.latest_chatbot_id()
+        print("latest_chatbot_id", latest_chatbot_id)
+        async for event in openai_model.astream_by_chatbot_id(
+            latest_chatbot_id, question
+        ):
+            yield event
+
+    def cache_stats(self) -> dict:
+        return {
+            **openai_model.cache_stats(),
+            "rate_limiter": rate_limiter.stats(),
+            "prompt_cache": prompt_cache_stats.stats(),
+            "http_cache": http_cache.stats() if http_cache else {"enabled": False},
+            "pdf_text": dict(pdf_text_stats),
+        }
@@ -1,45 +1,40 @@
-from langchain.prompts import PromptTemplate
-from langchain_openai import ChatOpenAI
-from langchain.chains import LLMChain
+import asyncio
+from langchain.prompts import ChatPromptTemplate
 from app.core.config import settings
-from typing import Dict, Any
+from app.llm.clients import client_factory
+from app.llm.rate_limiter import Priority, RateLimitExceeded, rate_limiter
+from app.llm.resilience import ResiliencePolicy
+from app.llm.tokens import count_tokens
+from app.llm.usage import prompt_cache_stats
+from typing import Dict, Any, AsyncIterator, List, Tuple
 
 
 class EOPService:
     def __init__(self):
-        self.llm = ChatOpenAI(
-            # model_name="gpt-4o-mini-2024-07-18",
-            model_name="gpt-4o",
-            openai_api_key=settings.OPENAI_API_KEY,
+        # self.model_name = "gpt-4o-mini-2024-07-18"
+        self.model_name = "gpt-4o"
+        # Completion tokens reserved with the rate limiter per plan
+        self.expected_completion_tokens = 3000
+        self.resilience = ResiliencePolicy.for_long_form("eop")
+        self.llm = client_factory.chat_model(
+            self.model_name,
             temperature=0.7,
+            timeout=self.resilience.timeout,
+            max_retries=0,
         )
 
-        self.eop_prompt_template = PromptTemplate(
-            input_variables=["flood_data", "resource_data", "location"],
-            template="""
+        # The instructions are a fixed system message and the per-request data
+        # follows in the human message, so the long instruction prefix is
+        # identical across calls and can be served from the provider's
+        # prompt cache.
+        self.eop_prompt_template = ChatPromptTemplate.from_messages(
+            [
+                ("system", """
 You are an AI assistant tasked with generating a detailed Emergency Operations Plan (EOP) for a flood scenario. Your goal is to create a comprehensive and actionable plan based on the provided flood data and available resources. Follow these instructions carefully to generate an effective EOP.
 
-### **Step 1: Review Flood Data:**
+The user message contains the flood data (<flood_data>), the resource data (<resource_data>) and the location (<location>). Based on the location, remove the location which is not in the location.
 
-<flood_data>
-{flood_data}
-</flood_data>
-
-### **Step 2: Review Resource Data:**
-
-<resource_data>
-{resource_data}
-</resource_data>
-
-### **Step 3: Location:**
-
-<location>
-{location}
-</location>
-
-Based on the location, remove the location which is not in the location.
-
-### **Step 4: Analyze the Provided Data:**
+### **Analyze the Provided Data:**
 
 - Water levels and their projected changes
 - High-risk areas
@@ -141,10 +136,30 @@ Using this information, generate an Emergency Operations Plan (EOP) that address
 </EOP>
 
 Note: Respond in Vietnamese
-            """,
+"""),
+                ("human", """
+### **Flood Data:**
+
+<flood_data>
+{flood_data}
+</flood_data>
+
+### **Resource Data:**
+
+<resource_data>
+{resource_data}
+</resource_data>
+
+### **Location:**
+
+<location>
+{location}
+</location>
+"""),
+            ]
         )
 
-        self.eop_chain = LLMChain(llm=self.llm, prompt=self.eop_prompt_template)
+        self.eop_chain = self.eop_prompt_template | self.llm
 
     def post_processing_eop(self, eop_content: str) -> str:
         """
@@ -158,6 +173,29 @@ Note: Respond in Vietnamese
 
         return eop_content
 
+    def _estimate_tokens(self, inputs: Dict[str, str]) -> int:
+        prompt_tokens = count_tokens(
+            self.eop_prompt_template.format(**inputs), self.model_name
+        )
+        return prompt_tokens + self.expected_completion_tokens
+
+    def _build_report(self, eop_content: str, location: str) -> Dict[str, Any]:
+        # post-processing the eop content
+        eop_content = self.post_processing_eop(eop_content)
+
+        # Create a structured response
+        report = {
+            "status": "success",
+            "eop_report": eop_content,
+            "metadata": {
+                "location": location,
+                "generated_at": "2024-01-01T00:00:00Z",  # You might want to use actual timestamp
+                "model_used": "gpt-4o-mini-2024-07-18",
+            },
+        }
+
+        return report
+
     async def generate_eop(
         self, flood_data: str, resource_data: str, location: str
     ) -> Dict[str, Any]:
@@ -173,34 +211,28 @@ Note: Respond in Vietnamese
             Dictionary containing the generated EOP report
         """
         try:
+            inputs = {
+                "flood_data": flood_data,
+                "resource_data": resource_data,
+                "location": location,
+            }
             # Execute the LangChain workflow
-            result = await self.eop_chain.ainvoke(
-                {
-                    "flood_data": flood_data,
-                    "resource_data": resource_data,
-                    "location": location,
-                }
+            message = await self.resilience.ainvoke(
+                self.eop_chain,
+                inputs,
+                self.model_name,
+                self._estimate_tokens(inputs),
+                Priority.EOP,
             )
 
             # Extract the EOP content from the response
-            eop_content = result.get("text", "")
-
-            # post-processing the eop content
-            eop_content = self.post_processing_eop(eop_content)
-
-            # Create a structured response
-            report = {
-                "status": "success",
-                "eop_report": eop_content,
-                "metadata": {
-                    "location": location,
-                    "generated_at": "2024-01-01T00:00:00Z",  # You might want to use actual timestamp
-                    "model_used": "gpt-4o-mini-2024-07-18",
-                },
-            }
+            eop_content = message.content
 
-            return report
+            # post-processing the eop content and create a structured response
+            return self._build_report(eop_content, location)
 
+        except RateLimitExceeded:
+            raise
         except Exception as e:
             return {
                 "status": "error",
@@ -209,5 +241,119 @@ Note: Respond in Vietnamese
             }
 
 
+    async def stream_eop(
+        self, flood_data: str, resource_data: str, location: str
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Stream an Emergency Operations Plan (EOP) as it is generated.
+
+        Yields ("token", {"content": ...}) events as tokens arrive from the
+        model, then one ("done", report) event with the post-processed report,
+        or ("error", ...) if generation fails.
+        """
+        try:
+            inputs = {
+                "flood_data": flood_data,
+                "resource_data": resource_data,
+                "location": location,
+            }
+            await rate_limiter.aacquire(
+                self.model_name, self._estimate_tokens(inputs), Priority.EOP
+            )
+
+            tokens = []
+            async for chunk in self.eop_chain.astream(inputs):
+                if chunk.usage_metadata:
+                    prompt_cache_stats.record(self.model_name, chunk)
+                if chunk.content:
+                    tokens.append(chunk.content)
+                    yield "token", {"content": chunk.content}
+
+            yield "done", self._build_report("".join(tokens), location)
+
+        except Exception as e:
+            yield "error", {
+                "status": "error",
+                "message": f"Failed to generate EOP: {str(e)}",
+                "eop_report": None,
+            }
+
+    async def stream_eop_batch(
+        self, flood_data: str, resource_data: str, locations: List[str]
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Generate EOPs for several locations sharing the same flood and resource data.
+
+        At most EOP_BATCH_CONCURRENCY plans are generated at once. Yields one
+        ("result", ...) event per location in completion order, each carrying
+        the location's index in the request and the generate_eop result (which
+        may be an error), then a ("done", ...) summary.
+        """
+        semaphore = asyncio.Semaphore(settings.EOP_BATCH_CONCURRENCY)
+
+        async def generate(index: int, location: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    result = await self.generate_eop(
+                        flood_data, resource_data, location
+                    )
+                except RateLimitExceeded as e:
+                    result = {
+                        "status": "error",
+                        "message": f"Failed to generate EOP: {str(e)}",
+                        "eop_report": None,
+                    }
+            return {"index": index, "location": location, **result}
+
+        tasks = [
+            asyncio.ensure_future(generate(index, location))
+            for index, location in enumerate(locations)
+        ]
+        failed = 0
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                result = await next_result
+                if result["status"] == "error":
+                    failed += 1
+                yield "result", result
+        finally:
+            # Stop outstanding generations if the client goes away
+            for task in tasks:
+                task.cancel()
+
+        yield "done", {
+            "status": self._batch_status(len(locations), failed),
+            "total": len(locations),
+            "succeeded": len(locations) - failed,
+            "failed": failed,
+        }
+
+    async def generate_eop_batch(
+        self, flood_data: str, resource_data: str, locations: List[str]
+    ) -> Dict[str, Any]:
+        """
+        Generate EOPs for several locations concurrently.
+
+        Returns the summary from stream_eop_batch plus the per-location
+        results in request order.
+        """
+        results = [None] * len(locations)
+        summary: Dict[str, Any] = {}
+        async for event, data in self.stream_eop_batch(
+            flood_data, resource_data, locations
+        ):
+            if event == "result":
+                results[data["index"]] = data
+            else:
+                summary = data
+        return {**summary, "results": results}
+
+    @staticmethod
+    def _batch_status(total: int, failed: int) -> str:
+        if failed == 0:
+            return "success"
+        return "error" if failed == total else "partial"
+
+
 # Create a singleton instance
 eop_service = EOPService()
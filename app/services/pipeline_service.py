@@ -0,0 +1,110 @@
+import time
+from typing import Dict, Any, AsyncIterator, Tuple
+
+from app.llm.rate_limiter import RateLimitExceeded
+from app.services.eop_service import eop_service
+from app.services.task_service import task_service
+
+
+class PipelineService:
+    """
+    Runs EOP generation and feeds the plan straight into task generation, so
+    clients get both in one request without sending the EOP back up.
+    """
+
+    def _result(
+        self,
+        eop: Dict[str, Any],
+        tasks: Dict[str, Any],
+        started: float,
+        eop_seconds: float,
+    ) -> Dict[str, Any]:
+        total_seconds = time.perf_counter() - started
+        return {
+            "status": "success" if tasks["status"] == "success" else "partial",
+            "eop": eop,
+            "tasks": tasks,
+            "metadata": {
+                "timings": {
+                    "eop_seconds": eop_seconds,
+                    "tasks_seconds": total_seconds - eop_seconds,
+                    "total_seconds": total_seconds,
+                }
+            },
+        }
+
+    async def _generate_tasks(
+        self, eop: Dict[str, Any], flood_data: str, resource_data: str
+    ) -> Dict[str, Any]:
+        try:
+            return await task_service.generate_tasks(
+                emergency_operations_plan=eop["eop_report"],
+                flood_data=flood_data,
+                resource_data=resource_data,
+            )
+        except RateLimitExceeded as e:
+            # The EOP is already paid for; report the tasks stage as failed
+            return {
+                "status": "error",
+                "message": f"Failed to generate tasks: {str(e)}",
+                "tasks": [],
+            }
+
+    async def generate_eop_and_tasks(
+        self, flood_data: str, resource_data: str, location: str
+    ) -> Dict[str, Any]:
+        """
+        Generate an EOP and the volunteer tasks derived from it.
+
+        Args:
+            flood_data: Information about the flood situation
+            resource_data: Information about available resources
+            location: Location information
+
+        Returns:
+            Dictionary with the EOP report, the task list and per-stage
+            timings in seconds. status is "partial" when the EOP was generated
+            but task generation failed, and the EOP error is returned as is
+            when the first stage fails.
+        """
+        started = time.perf_counter()
+        eop = await eop_service.generate_eop(flood_data, resource_data, location)
+        eop_seconds = time.perf_counter() - started
+        if eop["status"] == "error":
+            return eop
+
+        tasks = await self._generate_tasks(eop, flood_data, resource_data)
+        return self._result(eop, tasks, started, eop_seconds)
+
+    async def stream_eop_and_tasks(
+        self, flood_data: str, resource_data: str, location: str
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Stream the pipeline: the EOP's ("token", ...) events and its ("eop", report)
+        first, then ("tasks", task_list) and a final ("done", ...) with the
+        same status and timings as generate_eop_and_tasks. An EOP failure ends
+        the stream with ("error", ...).
+        """
+        started = time.perf_counter()
+        eop = None
+        async for event, data in eop_service.stream_eop(
+            flood_data, resource_data, location
+        ):
+            if event == "token":
+                yield event, data
+            elif event == "done":
+                eop = data
+            else:
+                yield "error", data
+                return
+        eop_seconds = time.perf_counter() - started
+        yield "eop", eop
+
+        tasks = await self._generate_tasks(eop, flood_data, resource_data)
+        result = self._result(eop, tasks, started, eop_seconds)
+        yield "tasks", tasks
+        yield "done", {"status": result["status"], "metadata": result["metadata"]}
+
+
+# Create a singleton instance
+pipeline_service = PipelineService()
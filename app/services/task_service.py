@@ -1,41 +1,32 @@
-from langchain.prompts import PromptTemplate
-from langchain_openai import ChatOpenAI
-from langchain.chains import LLMChain
-from app.core.config import settings
+from langchain.prompts import ChatPromptTemplate
+from app.llm.clients import client_factory
+from app.llm.rate_limiter import Priority, RateLimitExceeded
+from app.llm.resilience import ResiliencePolicy
+from app.llm.tokens import count_tokens
 from typing import Dict, Any, List
 import json
 import re
 
 class TaskService:
     def __init__(self):
-        self.llm = ChatOpenAI(
-            model_name='gpt-4o-mini-2024-07-18',
-            openai_api_key=settings.OPENAI_API_KEY,
-            temperature=0.7
+        self.model_name = 'gpt-4o-mini-2024-07-18'
+        # Completion tokens reserved with the rate limiter per task list
+        self.expected_completion_tokens = 1500
+        self.resilience = ResiliencePolicy.for_long_form("tasks")
+        self.llm = client_factory.chat_model(
+            self.model_name,
+            temperature=0.7,
+            timeout=self.resilience.timeout,
+            max_retries=0
         )
 
-        self.task_prompt_template = PromptTemplate(
-            input_variables=["emergency_operations_plan", "flood_data", "resource_data"],
-            template="""
+        # Fixed instructions first, per-request data last, so the instruction
+        # prefix can be reused by the provider's prompt cache
+        self.task_prompt_template = ChatPromptTemplate.from_messages([
+            ("system", """
 You are an AI assistant tasked with generating a volunteer task list based on an Emergency Operations Plan (EOP) and current situational data. Your goal is to create a prioritized list of tasks that volunteers can undertake to assist in flood response efforts.
 
-First, review the Emergency Operations Plan:
-
-<emergency_operations_plan>
-{emergency_operations_plan}
-</emergency_operations_plan>
-
-Now, consider the current flood situation:
-
-<flood_data>
-{flood_data}
-</flood_data>
-
-Take into account the available resources:
-
-<resource_data>
-{resource_data}
-</resource_data>
+The user message contains the Emergency Operations Plan (<emergency_operations_plan>), the current flood situation (<flood_data>) and the available resources (<resource_data>).
 
 Analyze the Emergency Operations Plan, flood data, and resource data to identify key areas where volunteer assistance is needed. Consider the following factors:
 1. Immediate life-saving actions
@@ -67,13 +58,23 @@ Remember to focus on tasks that are safe and appropriate for volunteers, conside
 Just respond tasks list
 
 Note: Respond in Vietnamese
-"""
-        )
+"""),
+            ("human", """
+<emergency_operations_plan>
+{emergency_operations_plan}
+</emergency_operations_plan>
 
-        self.task_chain = LLMChain(
-            llm=self.llm,
-            prompt=self.task_prompt_template
-        )
+<flood_data>
+{flood_data}
+</flood_data>
+
+<resource_data>
+{resource_data}
+</resource_data>
+"""),
+        ])
+
+        self.task_chain = self.task_prompt_template | self.llm
 
     def _parse_task_list(self, response_text: str) -> List[Dict[str, str]]:
         """
@@ -128,15 +129,26 @@ Note: Respond in Vietnamese
             Dictionary containing the generated task list
         """
         try:
-            # Execute the LangChain workflow
-            result = await self.task_chain.ainvoke({
+            inputs = {
                 "emergency_operations_plan": emergency_operations_plan,
                 "flood_data": flood_data,
                 "resource_data": resource_data
-            })
+            }
+            prompt_tokens = count_tokens(
+                self.task_prompt_template.format(**inputs), self.model_name
+            )
+
+            # Execute the LangChain workflow
+            message = await self.resilience.ainvoke(
+                self.task_chain,
+                inputs,
+                self.model_name,
+                prompt_tokens + self.expected_completion_tokens,
+                Priority.TASK
+            )
 
             # Extract the task list content from the response
-            task_list_content = result.get('text', '')
+            task_list_content = message.content
 
             # Parse the task list into structured format
             tasks = self._parse_task_list(task_list_content)
@@ -151,6 +163,8 @@ Note: Respond in Vietnamese
 
             return response
 
+        except RateLimitExceeded:
+            raise
         except Exception as e:
             return {
                 "status": "error",
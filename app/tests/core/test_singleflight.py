@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from app.core.singleflight import SingleFlight
+
+
+def test_follower_gets_result_when_leader_is_cancelled() -> None:
+    async def scenario() -> None:
+        single_flight = SingleFlight()
+        runs = 0
+        release = asyncio.Event()
+
+        async def work() -> int:
+            nonlocal runs
+            runs += 1
+            await release.wait()
+            return 42
+
+        leader = asyncio.create_task(single_flight.do("key", work))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(single_flight.do("key", work))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        release.set()
+
+        assert await follower == 42
+        assert runs == 1
+        assert single_flight.stats()["coalesced"] == 1
+        assert single_flight.stats()["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_shared_work_is_cancelled_once_every_caller_left() -> None:
+    async def scenario() -> None:
+        single_flight = SingleFlight()
+        cancelled = asyncio.Event()
+
+        async def work() -> None:
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        callers = [
+            asyncio.create_task(single_flight.do("key", work)) for _ in range(2)
+        ]
+        await asyncio.sleep(0)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+
+        await asyncio.wait_for(cancelled.wait(), 1)
+        assert single_flight.stats()["in_flight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_error_is_shared_with_followers() -> None:
+    async def scenario() -> None:
+        single_flight = SingleFlight()
+
+        async def work() -> None:
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream failed")
+
+        results = await asyncio.gather(
+            single_flight.do("key", work),
+            single_flight.do("key", work),
+            return_exceptions=True,
+        )
+
+        assert [str(result) for result in results] == ["upstream failed"] * 2
+        assert single_flight.stats()["executed"] == 1
+
+    asyncio.run(scenario())
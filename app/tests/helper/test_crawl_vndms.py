@@ -0,0 +1,100 @@
+from app.helper.crawl_vndms import VNDMSSync
+
+
+def _record(record_id: int, datetime: str, label: str) -> dict:
+    return {
+        "id": record_id,
+        "datetime": datetime,
+        "data": [{"label": label, "popupInfo": "Mã trạm: <b>ST1</b>"}],
+    }
+
+
+class FakeStrapi(VNDMSSync):
+    """VNDMSSync over an in-memory list of records instead of Strapi."""
+
+    def __init__(self, path: str, records: list[dict]):
+        super().__init__(path, retention_hours=24, page_size=2, bootstrap_limit=24)
+        self.records = records
+        self.requests = []
+
+    def _get(self, params):
+        self.requests.append(params)
+        records = sorted(self.records, key=lambda record: record["datetime"])
+        if params.get("sort") == "datetime:desc":
+            return {"data": records[::-1][: params["pagination[limit]"]]}
+
+        records = [
+            record
+            for record in records
+            if record["datetime"] >= params["filters[datetime][$gte]"]
+        ]
+        size = params["pagination[pageSize]"]
+        start = (params["pagination[page]"] - 1) * size
+        page_count = max(1, -(-len(records) // size))
+        return {
+            "data": records[start : start + size],
+            "meta": {"pagination": {"pageCount": page_count}},
+        }
+
+
+def _labels(items: list[dict]) -> list[str]:
+    return sorted(item["label"] for item in items)
+
+
+def test_merge_keeps_records_with_the_cursor_datetime(tmp_path) -> None:
+    sync = FakeStrapi(
+        str(tmp_path / "snapshot.json"),
+        [
+            _record(1, "2024-10-01T00:00:00.000Z", "A"),
+            _record(2, "2024-10-01T01:00:00.000Z", "B"),
+        ],
+    )
+    assert _labels(sync.sync()) == ["A", "B"]
+
+    # Written after the last sync, with the same datetime as the cursor
+    sync.records.append(_record(3, "2024-10-01T01:00:00.000Z", "C"))
+
+    assert _labels(sync.sync()) == ["A", "B", "C"]
+    assert sync._snapshot["cursor_ids"] == [2, 3]
+
+
+def test_merge_skips_records_already_merged_at_the_cursor(tmp_path) -> None:
+    sync = FakeStrapi(
+        str(tmp_path / "snapshot.json"),
+        [_record(1, "2024-10-01T01:00:00.000Z", "A")],
+    )
+    sync.sync()
+    snapshot = sync._snapshot
+
+    sync.sync()
+
+    # Nothing new: the cursor record was filtered out, so nothing was merged
+    assert sync._snapshot is snapshot
+
+
+def test_merge_does_not_touch_the_snapshot(tmp_path) -> None:
+    sync = FakeStrapi(str(tmp_path / "snapshot.json"), [])
+    snapshot = {"cursor": None, "cursor_ids": [], "labels": {}}
+
+    merged = sync._merge(snapshot, [_record(1, "2024-10-01T00:00:00.000Z", "A")])
+
+    assert snapshot == {"cursor": None, "cursor_ids": [], "labels": {}}
+    assert merged["cursor"] == "2024-10-01T00:00:00.000Z"
+    assert list(merged["labels"]) == ["A"]
+
+
+def test_failed_save_keeps_the_previous_snapshot(tmp_path) -> None:
+    sync = FakeStrapi(
+        str(tmp_path / "snapshot.json"),
+        [_record(1, "2024-10-01T00:00:00.000Z", "A")],
+    )
+    sync.sync()
+    sync.records.append(_record(2, "2024-10-01T02:00:00.000Z", "B"))
+
+    def fail(snapshot):
+        raise OSError("disk full")
+
+    sync._save = fail
+
+    assert _labels(sync.sync()) == ["A"]
+    assert sync._snapshot["cursor"] == "2024-10-01T00:00:00.000Z"
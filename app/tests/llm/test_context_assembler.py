@@ -0,0 +1,58 @@
+from langchain_core.documents import Document
+
+from app.llm.context_assembler import ContextAssembler
+from app.llm.tokens import count_tokens
+
+MODEL_NAME = "gpt-4o"
+
+
+def _assembler(token_budget: int) -> ContextAssembler:
+    return ContextAssembler(
+        model_name=MODEL_NAME, token_budget=token_budget, mmr_lambda=0.7
+    )
+
+
+def _text(prefix: str, words: int) -> str:
+    return " ".join(f"{prefix}{i}" for i in range(words))
+
+
+def test_single_segment_larger_than_budget_is_truncated() -> None:
+    text = _text("mua", 2000)
+    assembler = _assembler(token_budget=100)
+
+    context, stats = assembler.assemble([(Document(page_content=text), 0.1)])
+
+    assert stats["selected"] == 1
+    assert stats["truncated"] == 1
+    assert context
+    assert text.startswith(context)
+    assert count_tokens(context, MODEL_NAME) <= 100
+    assert stats["tokens"] <= 100
+
+
+def test_merged_adjacent_chunks_over_budget_are_kept() -> None:
+    text = _text("lu", 3000)
+    chunks = [text[start : start + 500] for start in range(0, len(text), 400)]
+    results = [(Document(page_content=chunk), 0.1) for chunk in chunks]
+    assembler = _assembler(token_budget=300)
+
+    context, stats = assembler.assemble(results)
+
+    assert stats["segments"] == 1
+    assert stats["selected"] == 1
+    assert context
+    assert count_tokens(context, MODEL_NAME) <= 300
+
+
+def test_later_segment_is_cut_to_remaining_budget() -> None:
+    first = _text("bao", 50)
+    second = _text("gio", 2000)
+    assembler = _assembler(token_budget=count_tokens(first, MODEL_NAME) + 50)
+
+    context, stats = assembler.assemble(
+        [(Document(page_content=first), 0.1), (Document(page_content=second), 0.5)]
+    )
+
+    assert stats["selected"] == 2
+    assert context.startswith(first + "\n")
+    assert stats["tokens"] <= assembler.token_budget
@@ -0,0 +1,45 @@
+import pytest
+
+from app.llm.rate_limiter import Priority, RateLimiter, RateLimitExceeded
+
+
+def _limiter(tmp_path, max_wait_seconds: float = 0.2) -> RateLimiter:
+    return RateLimiter(
+        path=str(tmp_path / "rate_limiter.sqlite3"),
+        limits={"gpt-4o": {"rpm": 100, "tpm": 1000}},
+        max_waiters=10,
+        max_wait_seconds=max_wait_seconds,
+    )
+
+
+@pytest.mark.parametrize("priority", [Priority.CHAT, Priority.TASK, Priority.EOP])
+def test_call_larger_than_usable_share_is_admitted_from_a_full_bucket(
+    tmp_path, priority: Priority
+) -> None:
+    limiter = _limiter(tmp_path)
+
+    # More tokens than the whole bucket, let alone the share above the reserve
+    assert limiter.try_acquire("gpt-4o", 5000, priority)
+
+
+def test_large_call_leaves_the_reserve_for_higher_priorities(tmp_path) -> None:
+    limiter = _limiter(tmp_path)
+    limiter.acquire("gpt-4o", 5000, Priority.CHAT)
+
+    assert not limiter.try_acquire("gpt-4o", 100, Priority.CHAT)
+    assert limiter.try_acquire("gpt-4o", 250, Priority.WARNING)
+
+
+def test_waiting_past_max_wait_is_rejected(tmp_path) -> None:
+    limiter = _limiter(tmp_path)
+    limiter.acquire("gpt-4o", 5000, Priority.CHAT)
+
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire("gpt-4o", 5000, Priority.CHAT)
+    assert limiter.stats()["rejected"] == 1
+
+
+def test_models_without_limits_are_not_limited(tmp_path) -> None:
+    limiter = _limiter(tmp_path)
+
+    assert limiter.try_acquire("other-model", 10**9, Priority.CHAT)
@@ -0,0 +1,135 @@
+import asyncio
+import time
+
+import pytest
+
+from app.llm import resilience as resilience_module
+from app.llm.rate_limiter import Priority
+from app.llm.resilience import ResiliencePolicy
+
+
+def _policy(**overrides) -> ResiliencePolicy:
+    options = {
+        "timeout": 5.0,
+        "deadline": 5.0,
+        "max_attempts": 3,
+        "backoff_initial": 0.01,
+        "backoff_max": 0.01,
+        "hedge": False,
+        "hedge_min_samples": 0,
+    }
+    options.update(overrides)
+    return ResiliencePolicy("test", **options)
+
+
+class FakeRateLimiter:
+    def __init__(self, hedge_budget: bool = True):
+        self.hedge_budget = hedge_budget
+        self.acquired = []
+        self.hedge_requests = 0
+
+    def acquire(self, model: str, tokens: int, priority: Priority) -> None:
+        self.acquired.append((model, tokens, priority))
+
+    async def aacquire(self, model: str, tokens: int, priority: Priority) -> None:
+        self.acquired.append((model, tokens, priority))
+
+    async def atry_acquire(self, model: str, tokens: int, priority: Priority) -> bool:
+        self.hedge_requests += 1
+        return self.hedge_budget
+
+
+class FlakyRunnable:
+    """Times out failures times, then answers."""
+
+    def __init__(self, failures: int, delay: float = 0.0):
+        self.failures = failures
+        self.delay = delay
+        self.calls = 0
+
+    async def ainvoke(self, inputs):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.calls <= self.failures:
+            raise asyncio.TimeoutError("upstream timed out")
+        return f"answer to {inputs}"
+
+    def invoke(self, inputs):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise asyncio.TimeoutError("upstream timed out")
+        return f"answer to {inputs}"
+
+
+def test_attempt_is_capped_at_the_time_left_before_the_deadline() -> None:
+    policy = _policy(timeout=10.0, deadline=0.3)
+
+    async def hang() -> None:
+        await asyncio.sleep(30)
+
+    started = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(policy.acall(hang))
+
+    # One attempt alone would have been allowed 10s
+    assert time.monotonic() - started < 1.0
+
+
+def test_retries_stop_at_the_deadline() -> None:
+    policy = _policy(timeout=0.2, deadline=0.5, max_attempts=10)
+    calls = 0
+
+    async def hang() -> None:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(30)
+
+    started = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(policy.acall(hang))
+
+    assert time.monotonic() - started < 1.0
+    assert calls < 10
+
+
+def test_ainvoke_reserves_budget_once_across_retries(monkeypatch) -> None:
+    limiter = FakeRateLimiter()
+    monkeypatch.setattr(resilience_module, "rate_limiter", limiter)
+    runnable = FlakyRunnable(failures=2)
+
+    result = asyncio.run(
+        _policy().ainvoke(runnable, "q", "gpt-4o", 1200, Priority.CHAT)
+    )
+
+    assert result == "answer to q"
+    assert runnable.calls == 3
+    assert limiter.acquired == [("gpt-4o", 1200, Priority.CHAT)]
+
+
+def test_invoke_reserves_budget_once_across_retries(monkeypatch) -> None:
+    limiter = FakeRateLimiter()
+    monkeypatch.setattr(resilience_module, "rate_limiter", limiter)
+    runnable = FlakyRunnable(failures=1)
+
+    result = _policy().invoke(runnable, "q", "gpt-4o", 800, Priority.TASK)
+
+    assert result == "answer to q"
+    assert runnable.calls == 2
+    assert limiter.acquired == [("gpt-4o", 800, Priority.TASK)]
+
+
+@pytest.mark.parametrize("hedge_budget", [True, False])
+def test_hedge_is_fired_only_with_budget(monkeypatch, hedge_budget: bool) -> None:
+    limiter = FakeRateLimiter(hedge_budget=hedge_budget)
+    monkeypatch.setattr(resilience_module, "rate_limiter", limiter)
+    policy = _policy(hedge=True, hedge_min_samples=1)
+    policy._latencies.append(0.01)
+    runnable = FlakyRunnable(failures=0, delay=0.1)
+
+    result = asyncio.run(policy.ainvoke(runnable, "q", "gpt-4o", 100, Priority.CHAT))
+
+    assert result == "answer to q"
+    assert limiter.hedge_requests == 1
+    assert runnable.calls == (2 if hedge_budget else 1)
+    assert policy.hedges == (1 if hedge_budget else 0)
+    assert policy.hedges_skipped == (0 if hedge_budget else 1)
@@ -0,0 +1,154 @@
+"""
+Benchmark nchmf news page parsing.
+
+Usage (from the project root):
+
+    python scripts/bench_html.py path/to/fixtures/*.html [--repeat 5]
+
+Fixtures are saved nchmf news pages; the bodies stored by the crawler's HTTP
+cache (data/http_cache/*.body) can be used as is. Compares the old
+html.parser + recursive extractor with each available parser backend and the
+iterative extractor, and checks the process pool throughput. Before timing,
+each backend's text is checked against the legacy extractor; exits with
+status 1 if any page differs.
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.helper import crawl_nchmf  # noqa: E402
+
+
+def legacy_extract_text(element):
+    """The recursive extractor with string += that crawl_nchmf used before."""
+    text = ""
+    for child in element.children:
+        if child.name:
+            if child.name == "script":
+                continue
+            text += legacy_extract_text(child)
+        elif isinstance(child, str):
+            text += child.strip() + "\n"
+    return text.strip()
+
+
+def legacy_parse(html: str) -> str | None:
+    soup = BeautifulSoup(html, "html.parser")
+    content_news = soup.find(class_="content-news")
+    return legacy_extract_text(content_news) if content_news else None
+
+
+def parse_with(parser: str):
+    def parse(html: str):
+        crawl_nchmf.HTML_PARSER = parser
+        return crawl_nchmf.parse_news_page(html, "https://nchmf.gov.vn/")
+
+    return parse
+
+
+def available_parsers() -> list[str]:
+    parsers = ["html.parser"]
+    try:
+        import lxml  # noqa: F401
+
+        parsers.append("lxml")
+    except ImportError:
+        print("lxml is not installed, skipping it")
+    return parsers
+
+
+def _normalize(text: str | None) -> str | None:
+    # The legacy extractor puts every text node on its own line while the
+    # current one joins inline text with spaces, so compare the characters
+    # without any whitespace
+    return None if text is None else "".join(text.split())
+
+
+def check(name: str, parse, paths: list[str], pages: list[str]) -> bool:
+    """Compare parse's article text with legacy_parse on pages without PDFs."""
+    mismatches = []
+    for path, page in zip(paths, pages, strict=True):
+        pdf_urls, text = parse(page)
+        # Pages linking a PDF carry the bulletin there, not in the text
+        if not pdf_urls and _normalize(text) != _normalize(legacy_parse(page)):
+            mismatches.append(path)
+    for path in mismatches:
+        print(f"{name}: text differs from the legacy extractor for {path}")
+    return not mismatches
+
+
+def run(name: str, func, pages: list[str], repeat: int) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(pages)
+        best = min(best, time.perf_counter() - started)
+    print(f"{name:<24} {best:8.3f}s  {len(pages) / best:10.1f} pages/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("fixtures", nargs="+", help="HTML files or glob patterns")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    paths = [path for pattern in args.fixtures for path in glob.glob(pattern)]
+    if not paths:
+        parser.error("no fixture files found")
+    pages = []
+    for path in paths:
+        with open(path, "rb") as file:
+            pages.append(file.read().decode("utf-8", errors="replace"))
+    print(f"{len(pages)} pages, best of {args.repeat}")
+
+    parsers = available_parsers()
+    matches = [
+        check(f"iterative {name}", parse_with(name), paths, pages) for name in parsers
+    ]
+    if not all(matches):
+        sys.exit(1)
+
+    run(
+        "legacy html.parser",
+        lambda items: [legacy_parse(page) for page in items],
+        pages,
+        args.repeat,
+    )
+    for name in parsers:
+        parse = parse_with(name)
+        run(
+            f"iterative {name}",
+            lambda items, parse=parse: [parse(page) for page in items],
+            pages,
+            args.repeat,
+        )
+
+    # The pool uses the configured backend
+    crawl_nchmf.HTML_PARSER = crawl_nchmf._html_parser()
+    workers = max(settings.PROCESS_EXECUTOR_WORKERS, 1)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Warm up the workers before timing
+        list(executor.map(parse_news_page, pages[:workers]))
+        run(
+            f"process pool x{workers}",
+            lambda items: list(executor.map(parse_news_page, items)),
+            pages,
+            args.repeat,
+        )
+
+
+def parse_news_page(html: str):
+    return crawl_nchmf.parse_news_page(html, "https://nchmf.gov.vn/")
+
+
+if __name__ == "__main__":
+    main()
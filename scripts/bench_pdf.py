@@ -0,0 +1,88 @@
+"""
+Benchmark bulletin PDF text extraction.
+
+Usage (from the project root):
+
+    python scripts/bench_pdf.py path/to/bulletins/*.pdf [--repeat 3]
+
+Reports pages/s for the old file-based extraction, the in-memory sequential
+path, the process-pool path and a text-cache hit.
+"""
+
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyPDF2 import PdfReader  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.helper import pdf  # noqa: E402
+
+
+def legacy_extract(path: str) -> str:
+    """Extraction as it was before: temp file on disk and string +=."""
+    with open(path, "rb") as source, tempfile.NamedTemporaryFile(
+        suffix=".pdf", delete=False
+    ) as temp:
+        temp.write(source.read())
+    try:
+        reader = PdfReader(temp.name)
+        all_text = ""
+        for page in reader.pages:
+            all_text += page.extract_text() + "\n"
+        return all_text
+    finally:
+        os.remove(temp.name)
+
+
+def run(name: str, func, items: list, pages: int, repeat: int) -> None:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for item in items:
+            func(item)
+        best = min(best, time.perf_counter() - started)
+    print(f"{name:<12} {best:8.3f}s  {pages / best:10.1f} pages/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("pdfs", nargs="+", help="PDF files or glob patterns")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    paths = [path for pattern in args.pdfs for path in glob.glob(pattern)]
+    if not paths:
+        parser.error("no PDF files found")
+    contents = []
+    for path in paths:
+        with open(path, "rb") as file:
+            contents.append(file.read())
+    pages = sum(len(PdfReader(path).pages) for path in paths)
+    print(f"{len(paths)} PDFs, {pages} pages, best of {args.repeat}")
+
+    run("legacy", legacy_extract, paths, pages, args.repeat)
+
+    settings.PDF_PARALLEL_MIN_PAGES = sys.maxsize
+    run("sequential", pdf._parse, contents, pages, args.repeat)
+
+    if settings.PROCESS_EXECUTOR_WORKERS > 0:
+        settings.PDF_PARALLEL_MIN_PAGES = 1
+        # Start the workers before timing
+        pdf._parse(contents[0])
+        run("parallel", pdf._parse, contents, pages, args.repeat)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        settings.PDF_TEXT_CACHE_DIR = cache_dir
+        for content in contents:
+            pdf.extract_text_from_pdf(content)
+        run("cached", pdf.extract_text_from_pdf, contents, pages, args.repeat)
+
+
+if __name__ == "__main__":
+    main()